@@ -6,6 +6,10 @@ from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 import stripe
 from flask_mail import Mail
+from app.cache import Cache
+from app.storage import Storage
+from app.geocoding import Geocoder
+from app.http_client import HttpClient
 
 
 db = SQLAlchemy()
@@ -13,6 +17,10 @@ migrate = Migrate()
 jwt = JWTManager()
 bcrypt = Bcrypt()
 mail = Mail()
+cache = Cache()
+storage = Storage()
+http_client = HttpClient()
+geocoder = Geocoder()
 
 
 
@@ -36,6 +44,15 @@ def create_app(env="default"):
     jwt.init_app(app)
     bcrypt.init_app(app)
     mail.init_app(app)
+    cache.init_app(app)
+    storage.init_app(app)
+    http_client.init_app(app)
+    geocoder.init_app(app)
+
+    # Appels Stripe via le client HTTP partagé (pool keep-alive, disjoncteur, métriques)
+    if app.config["STRIPE_USE_HTTP_POOL"]:
+        stripe.default_http_client = http_client.stripe_client(app.config["STRIPE_TIMEOUT"])
+    stripe.max_network_retries = app.config["STRIPE_MAX_NETWORK_RETRIES"]
     
     
     from app.models import RevokedToken
@@ -68,6 +85,10 @@ def create_app(env="default"):
     app.register_blueprint(insurance)
     app.register_blueprint(home)
 
+    from app.lifecycle import scheduler_cli
+
+    app.cli.add_command(scheduler_cli)
+
     CORS(app)
 
     return app
@@ -0,0 +1,195 @@
+from sqlalchemy import DDL, and_, case, event, exists, func, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import BLOCKING_RESERVATION_STATUSES, Insurance, Reservation, Vehicle, db
+
+
+# Réservation sans double location, garantie par la base de données :
+# - Postgres : contrainte d'exclusion sur (vehicle_id, daterange) pour les statuts bloquants ;
+# - SQLite : triggers qui refusent l'insertion / la modification d'une réservation qui chevauche.
+# La vérification préalable dans l'application ne sert qu'à donner un message précis ;
+# deux demandes simultanées qui la passent toutes les deux sont départagées par la base.
+
+OVERLAP_CONSTRAINT = "reservation_no_overlap"
+
+_BLOCKING = ", ".join(f"'{status}'" for status in BLOCKING_RESERVATION_STATUSES)
+
+POSTGRES_OVERLAP_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    f"ALTER TABLE reservation ADD CONSTRAINT {OVERLAP_CONSTRAINT} EXCLUDE USING gist ("
+    f"vehicle_id WITH =, daterange(start_date, end_date, '[]') WITH &&) WHERE (status IN ({_BLOCKING}))",
+]
+
+_SQLITE_OVERLAP = (
+    f"NEW.status IN ({_BLOCKING}) AND EXISTS (SELECT 1 FROM reservation AS other "
+    f"WHERE other.vehicle_id = NEW.vehicle_id AND other.status IN ({_BLOCKING}) "
+    f"AND other.start_date <= NEW.end_date AND other.end_date >= NEW.start_date"
+)
+
+SQLITE_OVERLAP_DDL = [
+    f"CREATE TRIGGER {OVERLAP_CONSTRAINT}_insert BEFORE INSERT ON reservation "
+    f"WHEN {_SQLITE_OVERLAP}) "
+    f"BEGIN SELECT RAISE(ABORT, '{OVERLAP_CONSTRAINT}'); END",
+    f"CREATE TRIGGER {OVERLAP_CONSTRAINT}_update BEFORE UPDATE OF vehicle_id, start_date, end_date, status ON reservation "
+    f"WHEN {_SQLITE_OVERLAP} AND other.id != NEW.id) "
+    f"BEGIN SELECT RAISE(ABORT, '{OVERLAP_CONSTRAINT}'); END",
+]
+
+for statement in POSTGRES_OVERLAP_DDL:
+    event.listen(Reservation.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_OVERLAP_DDL:
+    event.listen(Reservation.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+class ReservationConflict(Exception):
+    """Le véhicule a déjà une réservation bloquante sur la période (`status` : celle trouvée, si connue)."""
+
+    def __init__(self, status=None):
+        super().__init__(status)
+        self.status = status
+
+
+def reservation_overlaps(start_date, end_date):
+    """Réservations bloquantes qui chevauchent la période (bornes incluses)."""
+    return (
+        Reservation.status.in_(BLOCKING_RESERVATION_STATUSES),
+        Reservation.start_date <= end_date,
+        Reservation.end_date >= start_date,
+    )
+
+
+def find_conflict(vehicle_id, start_date, end_date):
+    """Statut de la réservation qui bloque la période (EN ATTENTE en dernier), ou None. Une requête indexée."""
+    return db.session.query(Reservation.status).filter(
+        Reservation.vehicle_id == vehicle_id, *reservation_overlaps(start_date, end_date)
+    ).order_by(case((Reservation.status == "EN ATTENTE", 1), else_=0)).limit(1).scalar()
+
+
+def is_overlap_violation(error):
+    """L'IntegrityError vient-elle de la contrainte anti-chevauchement ?"""
+    return getattr(error.orig, "pgcode", None) == "23P01" or OVERLAP_CONSTRAINT in str(error.orig)
+
+
+def book_vehicle(user_id, vehicle_id, start_date, end_date):
+    """
+    Crée une réservation EN ATTENTE et la commit. Lève ReservationConflict si la période est prise,
+    y compris quand une autre demande simultanée l'a obtenue entre la vérification et l'insertion.
+    """
+    status = find_conflict(vehicle_id, start_date, end_date)
+    if status is not None:
+        raise ReservationConflict(status)
+
+    reservation = Reservation(
+        user_id=user_id,
+        vehicle_id=vehicle_id,
+        start_date=start_date,
+        end_date=end_date,
+        status="EN ATTENTE"
+    )
+    db.session.add(reservation)
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_overlap_violation(e):
+            raise ReservationConflict()
+        raise
+    return reservation
+
+
+def day_bitmap(start_date, end_date, ranges):
+    """
+    Calendrier compact de la période : une chaîne d'un caractère par jour, "1" si le jour est pris
+    par l'une des périodes `ranges` ((début, fin), bornes incluses), "0" sinon.
+    """
+    days = bytearray(b"0" * ((end_date - start_date).days + 1))
+    for range_start, range_end in ranges:
+        first = max((range_start - start_date).days, 0)
+        last = min((range_end - start_date).days, len(days) - 1)
+        if first <= last:
+            days[first:last + 1] = b"1" * (last - first + 1)
+    return days.decode()
+
+
+def vehicle_calendars(vehicle_ids, start_date, end_date):
+    """
+    Calendriers (day_bitmap) de plusieurs véhicules en une seule requête : jointure externe des
+    véhicules sur leurs réservations bloquantes qui chevauchent la période. Les identifiants
+    inconnus sont absents du résultat.
+    """
+    if not vehicle_ids:
+        return {}
+
+    rows = db.session.query(Vehicle.id, Reservation.start_date, Reservation.end_date).outerjoin(
+        Reservation, and_(Reservation.vehicle_id == Vehicle.id, *reservation_overlaps(start_date, end_date))
+    ).filter(Vehicle.id.in_(vehicle_ids))
+
+    ranges = {}
+    for vehicle_id, range_start, range_end in rows:
+        ranges.setdefault(vehicle_id, [])
+        if range_start is not None:
+            ranges[vehicle_id].append((range_start, range_end))
+    return {vehicle_id: day_bitmap(start_date, end_date, booked) for vehicle_id, booked in ranges.items()}
+
+
+# --- Devis ---------------------------------------------------------------------
+# Prix d'une location = jours (bornes incluses, comme l'application) x prix par jour + assurance.
+# Le calcul est fait par la base pour tout le lot de véhicules, dans la même requête que la
+# vérification de disponibilité ; le paiement réutilise le même calcul pour valider le montant.
+
+def rental_days(start_date, end_date):
+    return (end_date - start_date).days + 1
+
+
+def _quote(vehicle_ids, start_date, end_date, insurance_cost, exclude_reservation_id=None):
+    days = rental_days(start_date, end_date)
+    conflicts = [Reservation.vehicle_id == Vehicle.id, *reservation_overlaps(start_date, end_date)]
+    if exclude_reservation_id is not None:
+        conflicts.append(Reservation.id != exclude_reservation_id)
+
+    rental_price = Vehicle.price_per_day * days
+    rows = db.session.query(
+        Vehicle.id,
+        Vehicle.title,
+        Vehicle.price_per_day,
+        exists().where(*conflicts).label("booked"),
+        rental_price.label("rental_price"),
+        insurance_cost.label("insurance_cost"),
+        (rental_price + insurance_cost).label("total"),
+    ).filter(Vehicle.id.in_(vehicle_ids))
+
+    return {
+        row.id: {
+            "vehicle_id": row.id,
+            "title": row.title,
+            "available": not row.booked,
+            "days": days,
+            "price_per_day": row.price_per_day,
+            "rental_price": round(row.rental_price, 2),
+            "insurance_cost": round(row.insurance_cost, 2),
+            "total": round(row.total, 2),
+        }
+        for row in rows
+    }
+
+
+def quote_vehicles(vehicle_ids, start_date, end_date, insurance_cost=0):
+    """
+    Disponibilité et prix de plusieurs véhicules pour la même période, en une requête.
+    `insurance_cost` (facultatif) s'ajoute au total de chaque véhicule. Les identifiants inconnus sont absents.
+    """
+    if not vehicle_ids:
+        return {}
+    return _quote(vehicle_ids, start_date, end_date, literal(float(insurance_cost)))
+
+
+def quote_reservation(reservation):
+    """Devis d'une réservation existante : location + assurances choisies pour elle, en une requête."""
+    insurance_cost = select(func.coalesce(func.sum(Insurance.cost), 0.0)).where(
+        Insurance.reservation_id == reservation.id
+    ).scalar_subquery()
+    quotes = _quote(
+        [reservation.vehicle_id], reservation.start_date, reservation.end_date, insurance_cost,
+        exclude_reservation_id=reservation.id,
+    )
+    return quotes.get(reservation.vehicle_id)
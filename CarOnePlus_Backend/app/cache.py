@@ -0,0 +1,211 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(prefix, params):
+    """Clé de cache stable à partir de paramètres normalisés (l'ordre des clés n'a pas d'importance)."""
+    payload = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{prefix}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+class TTLCache:
+    """Cache mémoire du process, borné (LRU) et avec expiration. Thread-safe."""
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _evicted(self, key):
+        """Appelé (verrou tenu) quand une entrée expire ou est évincée."""
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self._evicted(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self._evicted(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._evicted(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class MemoryCacheBackend(TTLCache):
+    """Backend par défaut : cache du process avec étiquettes (tags) pour l'invalidation ciblée."""
+
+    def __init__(self, ttl, maxsize=1024):
+        super().__init__(ttl, maxsize)
+        self._tags = {}
+        self._key_tags = {}
+
+    def _evicted(self, key):
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def set(self, key, value, ttl=None, tags=()):
+        with self._lock:
+            if key in self._data:
+                self._evicted(key)
+            super().set(key, value, ttl)
+            if key in self._data:
+                self._key_tags[key] = set(tags)
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self.delete(key)
+
+    def tags(self, prefix=""):
+        with self._lock:
+            return [tag for tag in self._tags if tag.startswith(prefix)]
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._tags.clear()
+            self._key_tags.clear()
+
+
+class RedisCacheBackend:
+    """
+    Backend partagé entre les workers, pour tout client compatible redis-py
+    (redis.Redis, fakeredis en local). L'éviction LRU est celle du serveur
+    (maxmemory-policy allkeys-lru) ; chaque entrée et chaque tag expire après `ttl`.
+    """
+
+    def __init__(self, client, ttl, namespace="caroneplus:cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def _key(self, key):
+        return f"{self.namespace}{key}"
+
+    def _tag(self, tag):
+        return f"{self.namespace}tag:{tag}"
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = ttl or self.ttl
+        pipe = self.client.pipeline()
+        pipe.setex(self._key(key), ttl, value)
+        for tag in tags:
+            pipe.sadd(self._tag(tag), key)
+            pipe.expire(self._tag(tag), ttl)
+            pipe.sadd(self._tag(""), tag)
+        pipe.execute()
+
+    def invalidate_tags(self, tags):
+        for tag in tags:
+            keys = self.client.smembers(self._tag(tag))
+            pipe = self.client.pipeline()
+            for key in keys:
+                if isinstance(key, bytes):
+                    key = key.decode("utf-8")
+                pipe.delete(self._key(key))
+            pipe.delete(self._tag(tag))
+            pipe.srem(self._tag(""), tag)
+            pipe.execute()
+
+    def tags(self, prefix=""):
+        tags = []
+        for tag in self.client.smembers(self._tag("")):
+            if isinstance(tag, bytes):
+                tag = tag.decode("utf-8")
+            if not tag.startswith(prefix):
+                continue
+            # Nettoyer l'index des tags dont toutes les entrées ont expiré
+            if not self.client.exists(self._tag(tag)):
+                self.client.srem(self._tag(""), tag)
+                continue
+            tags.append(tag)
+        return tags
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.namespace}*"):
+            self.client.delete(key)
+
+
+class Cache:
+    """
+    Extension Flask de cache des résultats de requêtes.
+    Backend mémoire par défaut ; Redis si CACHE_REDIS_URL est défini ou si un client est fourni.
+    Les valeurs sont des chaînes (corps JSON déjà sérialisés).
+    """
+
+    def __init__(self, app=None, client=None):
+        self.backend = None
+        self.client = client
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        ttl = app.config["CACHE_DEFAULT_TTL"]
+        client = self.client
+        if client is None and app.config.get("CACHE_REDIS_URL"):
+            import redis  # dépendance optionnelle, uniquement pour le backend partagé
+
+            client = redis.Redis.from_url(app.config["CACHE_REDIS_URL"])
+
+        if client is not None:
+            self.backend = RedisCacheBackend(client, ttl)
+        else:
+            self.backend = MemoryCacheBackend(ttl, maxsize=app.config["CACHE_MAX_ENTRIES"])
+        app.extensions["cache"] = self
+
+    @property
+    def shared(self):
+        """Le cache est-il partagé entre processus (Redis) ? Sinon chaque processus a le sien."""
+        return isinstance(self.backend, RedisCacheBackend)
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None, tags=()):
+        self.backend.set(key, value, ttl=ttl, tags=tags)
+
+    def invalidate_tags(self, tags):
+        if tags:
+            self.backend.invalidate_tags(tags)
+
+    def tags(self, prefix=""):
+        return self.backend.tags(prefix)
+
+    def clear(self):
+        self.backend.clear()
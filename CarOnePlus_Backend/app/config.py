@@ -19,10 +19,67 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
     ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 
+    # Pagination : taille de page maximale acceptée côté serveur
+    MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
+
+    # Recherche ?q= : au-delà de ce nombre de résultats, tri par récence plutôt que par pertinence
+    SEARCH_RANK_MAX_MATCHES = int(os.environ.get("SEARCH_RANK_MAX_MATCHES", 5000))
+
+    # Cache des listes publiques de véhicules (mémoire du process, ou Redis si l'URL est définie)
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+    CACHE_DEFAULT_TTL = int(os.environ.get("CACHE_DEFAULT_TTL", 30))  # secondes
+    CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+
+    # Stockage des fichiers envoyés (par contenu, voir app/storage.py)
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+    STORAGE_ROOT = os.environ.get("STORAGE_ROOT", os.path.join(os.getcwd(), "static", "storage"))
+
+    # Déclinaisons d'images redimensionnées (?w=, ?h=, ?fmt=webp)
+    IMAGE_CACHE_FOLDER = os.environ.get("IMAGE_CACHE_FOLDER", os.path.join(os.getcwd(), "cache", "images"))
+    IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+    IMAGE_RESIZE_WORKERS = int(os.environ.get("IMAGE_RESIZE_WORKERS", 2))
+    IMAGE_RESIZE_TIMEOUT = 30  # secondes
+
+    # Import en masse de véhicules (CSV / NDJSON) : nombre de lignes insérées par lot
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 500))
+
+    # Client HTTP sortant partagé (voir app/http_client.py)
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))  # secondes, par tentative
+    HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10))
+    HTTP_DEADLINE = float(os.environ.get("HTTP_DEADLINE", 15))  # secondes, réessais compris
+    HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 2))
+    HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", 0.2))  # secondes, doublé à chaque réessai
+    HTTP_BREAKER_THRESHOLD = int(os.environ.get("HTTP_BREAKER_THRESHOLD", 5))  # échecs consécutifs
+    HTTP_BREAKER_RESET = float(os.environ.get("HTTP_BREAKER_RESET", 30))  # secondes avant un appel d'essai
+    HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", 10))  # hôtes gardés en pool
+    HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 20))  # connexions par hôte
+
+    # Géocodage des adresses (Google, ou "static" pour les tests) avec cache mémoire + base
+    GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY")
+    GEOCODER = os.environ.get("GEOCODER", "google")
+    GEOCODER_URL = os.environ.get("GEOCODER_URL", "https://maps.googleapis.com/maps/api/geocode/json")
+    GEOCODER_TIMEOUT = 5  # secondes, délai total par adresse (réessais compris)
+    GEOCODE_CACHE_TTL = int(os.environ.get("GEOCODE_CACHE_TTL", 30 * 24 * 3600))
+    GEOCODE_NEGATIVE_TTL = int(os.environ.get("GEOCODE_NEGATIVE_TTL", 24 * 3600))  # adresses introuvables
+    GEOCODE_CACHE_SIZE = int(os.environ.get("GEOCODE_CACHE_SIZE", 4096))
+    GEOCODE_RATE_LIMIT = float(os.environ.get("GEOCODE_RATE_LIMIT", 10))  # appels externes par seconde
+    GEOCODE_WORKERS = int(os.environ.get("GEOCODE_WORKERS", 2))  # géocodage en arrière-plan
+    GEOCODE_BATCH_SIZE = int(os.environ.get("GEOCODE_BATCH_SIZE", 50))
+    GEOCODE_QUEUE_SIZE = int(os.environ.get("GEOCODE_QUEUE_SIZE", 10000))
+
     # Stripe
     STRIPE_API_KEY = os.environ.get("STRIPE_API_KEY")
     STRIPE_PUBLIC_KEY = os.environ.get("STRIPE_PUBLIC_KEY")
     STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
+    STRIPE_USE_HTTP_POOL = os.environ.get("STRIPE_USE_HTTP_POOL", "true").lower() in ["true", "1", "yes"]
+    STRIPE_TIMEOUT = int(os.environ.get("STRIPE_TIMEOUT", 30))  # secondes
+    STRIPE_MAX_NETWORK_RETRIES = int(os.environ.get("STRIPE_MAX_NETWORK_RETRIES", 2))
+
+    # Cycle de vie des réservations (flask scheduler run) ; ses invalidations de cache ne
+    # parviennent aux workers web qu'avec le cache partagé (CACHE_REDIS_URL)
+    RESERVATION_PENDING_TTL = int(os.environ.get("RESERVATION_PENDING_TTL", 24 * 3600))  # secondes sans paiement avant expiration
+    SCHEDULER_INTERVAL = int(os.environ.get("SCHEDULER_INTERVAL", 60))  # secondes entre deux passages
+    SCHEDULER_LEASE_TTL = int(os.environ.get("SCHEDULER_LEASE_TTL", 180))  # bail du leader, renouvelé à chaque passage
 
 
     # Email SMTP (Brevo)
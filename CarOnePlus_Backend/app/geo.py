@@ -0,0 +1,121 @@
+import math
+
+from sqlalchemy import Float, Integer, and_, func, or_, type_coerce
+
+from app.models import Vehicle
+
+
+# Calculs géographiques partagés par les routes /geo.
+# La recherche de proximité se fait en deux temps dans une seule requête :
+# une boîte englobante sur lat / lng (servie par l'index ix_vehicle_lat_lng) élimine presque
+# toutes les lignes, puis la distance exacte (haversine) est calculée sur les candidats restants.
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distance orthodromique en kilomètres entre deux points (en Python)."""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_km_expr(lat, lng):
+    """
+    Distance haversine en SQL entre le véhicule et (lat, lng).
+    Utilise sin / cos / asin / sqrt (natifs sous Postgres, fonctions mathématiques de SQLite ≥ 3.35).
+    """
+    half_dlat = func.radians(Vehicle.lat - lat) / 2
+    half_dlng = func.radians(Vehicle.lng - lng) / 2
+    sin_dlat = func.sin(half_dlat)
+    sin_dlng = func.sin(half_dlng)
+    a = sin_dlat * sin_dlat + math.cos(math.radians(lat)) * func.cos(func.radians(Vehicle.lat)) * sin_dlng * sin_dlng
+    return type_coerce(2 * EARTH_RADIUS_KM * func.asin(func.sqrt(a)), Float)
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Boîte (min_lat, max_lat, min_lng, max_lng) contenant le cercle de rayon `radius_km`.
+    La largeur en longitude tient compte de la latitude ; près des pôles, toute la longitude est couverte.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), min(max_lat, 90), -180, 180
+
+    dlng = math.degrees(math.asin(min(1.0, math.sin(math.radians(dlat)) / math.cos(math.radians(lat)))))
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def bounding_box_filter(lat, lng, radius_km):
+    """Condition SQL de la boîte englobante, y compris quand elle traverse l'antiméridien."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    lat_range = Vehicle.lat.between(min_lat, max_lat)
+
+    if min_lng < -180:
+        lng_range = or_(Vehicle.lng >= min_lng + 360, Vehicle.lng <= max_lng)
+    elif max_lng > 180:
+        lng_range = or_(Vehicle.lng >= min_lng, Vehicle.lng <= max_lng - 360)
+    else:
+        lng_range = Vehicle.lng.between(min_lng, max_lng)
+    return and_(lat_range, lng_range)
+
+
+def within_radius(query, lat, lng, radius_km):
+    """
+    Restreint `query` aux véhicules situés à moins de `radius_km` de (lat, lng).
+    Retourne (query, distance) où `distance` est l'expression SQL de la distance en km.
+    """
+    distance = distance_km_expr(lat, lng)
+    query = query.filter(
+        Vehicle.lat.isnot(None),
+        Vehicle.lng.isnot(None),
+        bounding_box_filter(lat, lng, radius_km),
+        distance <= radius_km,
+    )
+    return query, distance
+
+
+# --- Grille de regroupement pour la carte -----------------------------------
+# À chaque niveau de zoom, le monde est découpé en 2^zoom x 2^zoom tuiles (en degrés),
+# chacune divisée en GRID_CELLS x GRID_CELLS cellules. Les véhicules sont regroupés par
+# cellule ; le résultat est mis en cache par tuile.
+
+GRID_CELLS = 8
+
+
+def cell_size(zoom):
+    """(largeur, hauteur) d'une cellule en degrés de longitude / latitude."""
+    tiles = 2 ** zoom
+    return 360.0 / tiles / GRID_CELLS, 180.0 / tiles / GRID_CELLS
+
+
+def tiles_for_bbox(min_lng, min_lat, max_lng, max_lat, zoom):
+    """Tuiles (x, y) qui recouvrent la boîte."""
+    tiles = 2 ** zoom
+    width, height = 360.0 / tiles, 180.0 / tiles
+
+    def index(value, origin, size):
+        return min(max(int(math.floor((value + origin) / size)), 0), tiles - 1)
+
+    xs = range(index(min_lng, 180, width), index(max_lng, 180, width) + 1)
+    ys = range(index(min_lat, 90, height), index(max_lat, 90, height) + 1)
+    return [(x, y) for x in xs for y in ys]
+
+
+def tile_bounds(x, y, zoom):
+    """(min_lng, min_lat, max_lng, max_lat) d'une tuile."""
+    tiles = 2 ** zoom
+    width, height = 360.0 / tiles, 180.0 / tiles
+    return x * width - 180, y * height - 90, (x + 1) * width - 180, (y + 1) * height - 90
+
+
+def cell_index_exprs(zoom):
+    """Expressions SQL de l'indice global (colonne, ligne) de la cellule d'un véhicule."""
+    width, height = cell_size(zoom)
+    return (
+        type_coerce(func.floor((Vehicle.lng + 180) / width), Integer),
+        type_coerce(func.floor((Vehicle.lat + 90) / height), Integer),
+    )
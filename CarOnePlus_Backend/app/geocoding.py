@@ -0,0 +1,365 @@
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import click
+import requests
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, update
+
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+# Géocodage d'adresses avec cache à deux niveaux :
+# - un LRU en mémoire du process (réponses immédiates pour les adresses fréquentes) ;
+# - la table geocode_cache, partagée par tous les workers, avec une date d'expiration.
+# Les adresses introuvables sont aussi mises en cache (durée plus courte), et des demandes
+# simultanées pour la même adresse ne déclenchent qu'un seul appel au service externe.
+#
+# Les véhicules créés (ou dont l'adresse change) sont géocodés en arrière-plan : leurs ids
+# sont mis dans une file bornée, traitée par quelques threads qui géocodent par lots
+# (appels externes limités en débit) et écrivent les coordonnées en une seule requête par lot.
+
+GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
+# Valeur mise en cache pour une adresse introuvable (None signifie « absent du cache »)
+NOT_FOUND = ()
+
+
+class GeocodingError(Exception):
+    """Échec du service de géocodage (réseau, quota, clé invalide...). Jamais mis en cache."""
+
+
+def normalize_address(address):
+    """Forme canonique d'une adresse : casse, accents composés, ponctuation et espaces uniformisés."""
+    address = unicodedata.normalize("NFKC", address or "").lower()
+    address = re.sub(r"[\s,;]+", " ", address)
+    return address.strip(" .")
+
+
+def address_key(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class GoogleGeocoder:
+    """
+    Service externe : API Google Geocoding, appelée via le client HTTP partagé (pool, réessais, disjoncteur).
+    L'URL est configurable pour pointer vers un bouchon local.
+    """
+
+    def __init__(self, client, api_key, url=GOOGLE_GEOCODE_URL, timeout=5):
+        self.client = client
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+
+    def geocode(self, address):
+        """Retourne (lat, lng), ou None si l'adresse est introuvable. Lève GeocodingError sinon."""
+        try:
+            response = self.client.get(self.url, params={"address": address, "key": self.api_key}, deadline=self.timeout)
+        except requests.RequestException as e:
+            raise GeocodingError(str(e))
+        if response.status_code != 200:
+            raise GeocodingError(f"HTTP {response.status_code}")
+
+        data = response.json()
+        if data["status"] == "ZERO_RESULTS":
+            return None
+        if data["status"] != "OK":
+            raise GeocodingError(data["status"])
+
+        location = data["results"][0]["geometry"]["location"]
+        return location["lat"], location["lng"]
+
+
+class StaticGeocoder:
+    """Service de test : adresses normalisées -> (lat, lng), sans accès réseau."""
+
+    def __init__(self, results=None):
+        self.results = {normalize_address(address): tuple(position) for address, position in (results or {}).items()}
+        self.calls = 0
+
+    def geocode(self, address):
+        self.calls += 1
+        return self.results.get(normalize_address(address))
+
+
+class RateLimiter:
+    """Espace les appels d'au moins 1 / `rate` seconde, tous threads confondus."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _store(key, address, position, expires_at):
+    """Enregistre (ou remplace) le résultat dans la table geocode_cache et commit."""
+    from app.models import GeocodeCache, db
+
+    values = {
+        "key": key,
+        "address": address,
+        "lat": position[0] if position else None,
+        "lng": position[1] if position else None,
+        "expires_at": expires_at,
+    }
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        db.session.merge(GeocodeCache(**values))
+        db.session.commit()
+        return
+
+    statement = insert(GeocodeCache.__table__).values(**values)
+    statement = statement.on_conflict_do_update(
+        index_elements=["key"], set_={name: statement.excluded[name] for name in ("address", "lat", "lng", "expires_at")}
+    )
+    db.session.execute(statement)
+    db.session.commit()
+
+
+class Geocoder:
+    """Extension Flask : géocodage avec cache mémoire + base de données et regroupement des appels."""
+
+    def __init__(self, app=None):
+        self.upstream = None
+        self._memory = None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._app = None
+        self._queue = None
+        self._workers = []
+        self._workers_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, upstream=None):
+        """`upstream` remplace le service configuré (GEOCODER), par exemple par un StaticGeocoder en test."""
+        if upstream is None:
+            if app.config["GEOCODER"] == "static":
+                upstream = StaticGeocoder()
+            else:
+                from app import http_client
+
+                upstream = GoogleGeocoder(
+                    http_client, app.config["GOOGLE_MAPS_API_KEY"], app.config["GEOCODER_URL"], app.config["GEOCODER_TIMEOUT"]
+                )
+        self.upstream = upstream
+        self.ttl = app.config["GEOCODE_CACHE_TTL"]
+        self.negative_ttl = app.config["GEOCODE_NEGATIVE_TTL"]
+        self._memory = TTLCache(self.ttl, app.config["GEOCODE_CACHE_SIZE"])
+        self.limiter = RateLimiter(app.config["GEOCODE_RATE_LIMIT"])
+        self.batch_size = app.config["GEOCODE_BATCH_SIZE"]
+        self.worker_count = app.config["GEOCODE_WORKERS"]
+        self._queue = queue.Queue(maxsize=app.config["GEOCODE_QUEUE_SIZE"])
+        self._app = app
+        app.extensions["geocoder"] = self
+        app.cli.add_command(geocode_cli)
+
+    def geocode(self, address):
+        """
+        Retourne (lat, lng) pour l'adresse, ou None si elle est introuvable.
+        Lève GeocodingError si le service externe échoue. Peut commit la session (écriture du cache).
+        """
+        normalized = normalize_address(address)
+        if not normalized:
+            return None
+        key = address_key(normalized)
+
+        cached = self._memory.get(key)
+        if cached is None:
+            cached = self._load(key)
+        if cached is None:
+            cached = self._coalesced_lookup(key, normalized)
+        return cached or None
+
+    def _load(self, key):
+        """Lit la table geocode_cache ; une entrée expirée est ignorée (elle sera remplacée)."""
+        from app.models import GeocodeCache, db
+
+        entry = db.session.get(GeocodeCache, key)
+        if entry is None or entry.expires_at <= datetime.utcnow():
+            return None
+
+        position = (entry.lat, entry.lng) if entry.lat is not None else NOT_FOUND
+        remaining = (entry.expires_at - datetime.utcnow()).total_seconds()
+        self._memory.set(key, position, ttl=min(remaining, self.ttl))
+        return position
+
+    def _coalesced_lookup(self, key, normalized):
+        """Un seul appel externe par adresse à la fois ; les autres demandes attendent son résultat."""
+        with self._pending_lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            self.limiter.acquire()
+            position = self.upstream.geocode(normalized)
+            position = tuple(position) if position else NOT_FOUND
+            ttl = self.ttl if position else self.negative_ttl
+            _store(key, normalized, position, datetime.utcnow() + timedelta(seconds=ttl))
+            self._memory.set(key, position, ttl=ttl)
+            future.set_result(position)
+            return position
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._pending_lock:
+                self._pending.pop(key, None)
+
+    # --- Géocodage des véhicules -------------------------------------------
+
+    def geocode_vehicles(self, vehicle_ids):
+        """
+        Géocode les véhicules encore sans coordonnées parmi `vehicle_ids` et écrit les résultats
+        en une requête (executemany). Retourne les compteurs {located, not_found, failed}.
+        """
+        from app.models import Vehicle, db
+        from app.routes.vehicles import VEHICLE_LISTING_FIELDS, invalidate_vehicle_listings
+
+        stats = {"located": 0, "not_found": 0, "failed": 0}
+        rows = db.session.query(*[getattr(Vehicle, name) for name in VEHICLE_LISTING_FIELDS]).filter(
+            Vehicle.id.in_(vehicle_ids), Vehicle.lat.is_(None)
+        ).all()
+
+        updates = []
+        snapshots = []
+        for row in rows:
+            before = row._asdict()
+            try:
+                position = self.geocode(before["localisation"])
+            except GeocodingError as e:
+                logger.warning("Geocoding failed for vehicle %s: %s", before["id"], e)
+                stats["failed"] += 1
+                continue
+            if position is None:
+                stats["not_found"] += 1
+                continue
+            updates.append({"b_id": before["id"], "b_address": before["localisation"], "b_lat": position[0], "b_lng": position[1]})
+            snapshots.append((before, {**before, "lat": position[0], "lng": position[1]}))
+
+        if updates:
+            # Pas d'écrasement si l'adresse a changé entre-temps (le nouveau géocodage est déjà en file)
+            table = Vehicle.__table__
+            statement = update(table).where(
+                table.c.id == bindparam("b_id"), table.c.localisation == bindparam("b_address")
+            ).values(lat=bindparam("b_lat"), lng=bindparam("b_lng"))
+            db.session.execute(statement, updates)
+            db.session.commit()
+            for before, after in snapshots:
+                invalidate_vehicle_listings(before, after)
+
+        stats["located"] = len(updates)
+        return stats
+
+    def enqueue(self, vehicle_ids):
+        """Met des véhicules en file de géocodage. Si la file est pleine, `flask geocode backfill` les rattrapera."""
+        self._start_workers()
+        for position, vehicle_id in enumerate(vehicle_ids):
+            try:
+                self._queue.put_nowait(vehicle_id)
+            except queue.Full:
+                # Un seul avertissement pour tout le reste (import en masse)
+                logger.warning(
+                    "Geocoding queue is full, %s vehicle(s) left for the backfill (from id %s)",
+                    len(vehicle_ids) - position, vehicle_id,
+                )
+                return
+
+    def _start_workers(self):
+        with self._workers_lock:
+            if self._workers:
+                return
+            for i in range(self.worker_count):
+                worker = threading.Thread(target=self._work, name=f"geocoder-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            batch = [self._queue.get()]
+            # Regroupe ce qui arrive dans la foulée, jusqu'à la taille d'un lot
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=0.5))
+                except queue.Empty:
+                    break
+
+            with self._app.app_context():
+                from app.models import db
+
+                try:
+                    self.geocode_vehicles(batch)
+                except Exception:
+                    logger.exception("Geocoding batch failed")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+                    for _ in batch:
+                        self._queue.task_done()
+
+
+geocode_cli = AppGroup("geocode", help="Géocodage des adresses des véhicules.")
+
+
+@geocode_cli.command("backfill")
+@click.option("--batch-size", type=int, help="Véhicules par lot (GEOCODE_BATCH_SIZE par défaut).")
+def geocode_backfill(batch_size):
+    """Géocode tous les véhicules sans coordonnées, en affichant la progression et le débit."""
+    from app import geocoder
+    from app.models import Vehicle, db
+
+    batch_size = batch_size or geocoder.batch_size
+    pending = Vehicle.query.filter(Vehicle.lat.is_(None)).count()
+    click.echo(f"{pending} vehicle(s) without coordinates")
+
+    totals = {"located": 0, "not_found": 0, "failed": 0}
+    processed = 0
+    last_id = 0
+    started = time.monotonic()
+    while True:
+        # Parcours par id croissant : les adresses introuvables ne sont pas reprises en boucle
+        ids = [vehicle_id for (vehicle_id,) in db.session.query(Vehicle.id).filter(
+            Vehicle.lat.is_(None), Vehicle.id > last_id
+        ).order_by(Vehicle.id).limit(batch_size)]
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        for name, count in geocoder.geocode_vehicles(ids).items():
+            totals[name] += count
+        processed += len(ids)
+        elapsed = time.monotonic() - started
+        click.echo(
+            f"{processed}/{pending} processed, {totals['located']} located, {totals['not_found']} not found, "
+            f"{totals['failed']} failed ({processed / elapsed:.1f} vehicles/s)"
+        )
+
+    click.echo(f"Done in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,45 @@
+import hashlib
+from datetime import timezone
+
+from flask import current_app, request
+
+
+def make_etag(*parts):
+    """ETag fort calculé à partir de la version de la ressource et des paramètres de la représentation."""
+    return hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def _as_utc(value):
+    """Les dates en base sont naïves et en UTC ; on les rend comparables aux en-têtes HTTP."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Retourne une réponse 304 si la copie du client est encore valide, sinon None.
+    À appeler avant toute sérialisation pour éviter les requêtes inutiles.
+    If-None-Match est prioritaire sur If-Modified-Since (RFC 9110).
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified is not None:
+        fresh = _as_utc(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    return add_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def add_validators(response, etag, last_modified=None):
+    """Ajoute ETag / Last-Modified ; le client doit revalider à chaque affichage."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
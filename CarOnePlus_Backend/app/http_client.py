@@ -0,0 +1,254 @@
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Client HTTP partagé pour les appels sortants (géocodage, Stripe...).
+# - une seule Session : connexions keep-alive réutilisées (pool par hôte) ;
+# - un délai maximal par appel, réessais compris (deadline), et des timeouts par tentative ;
+# - réessais bornés avec attente exponentielle aléatoire (jitter) pour les requêtes idempotentes ;
+# - un disjoncteur par hôte : après plusieurs échecs consécutifs, les appels échouent
+#   immédiatement pendant un moment au lieu de bloquer des workers ;
+# - des métriques par hôte (latences, erreurs, réessais).
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Levée sans appel réseau quand le disjoncteur de l'hôte est ouvert."""
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Levée quand le délai total de l'appel (réessais compris) est écoulé."""
+
+
+class CircuitBreaker:
+    """
+    Fermé : les appels passent. Ouvert (après `failure_threshold` échecs consécutifs) : ils sont refusés
+    pendant `reset_timeout` secondes. Ensuite, un seul appel d'essai passe (semi-ouvert) et referme
+    le disjoncteur s'il réussit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class HostMetrics:
+    """Compteurs et latences récentes d'un hôte."""
+
+    def __init__(self, window=512):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.total_latency = 0.0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record(self, latency, error):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_latency += latency
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "short_circuited": self.short_circuited,
+            "avg_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else None,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+        }
+
+
+class InstrumentedSession(requests.Session):
+    """
+    Session qui passe par le disjoncteur et enregistre les métriques de chaque tentative.
+    Elle peut être confiée telle quelle à des bibliothèques tierces (client HTTP de Stripe).
+    """
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        breaker = self.client.breaker(host)
+        metrics = self.client.host_metrics(host)
+        if not breaker.allow():
+            metrics.incr("short_circuited")
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        kwargs.setdefault("timeout", self.client.timeout)
+        started = time.monotonic()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException:
+            metrics.record(time.monotonic() - started, error=True)
+            breaker.record_failure()
+            raise
+
+        failed = response.status_code >= 500 or response.status_code == 429
+        metrics.record(time.monotonic() - started, error=failed)
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+class HttpClient:
+    """Extension Flask : client HTTP sortant partagé par toute l'application."""
+
+    def __init__(self, app=None):
+        self.session = None
+        self._breakers = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.timeout = (app.config["HTTP_CONNECT_TIMEOUT"], app.config["HTTP_READ_TIMEOUT"])
+        self.deadline = app.config["HTTP_DEADLINE"]
+        self.retries = app.config["HTTP_RETRIES"]
+        self.backoff = app.config["HTTP_BACKOFF"]
+        self.failure_threshold = app.config["HTTP_BREAKER_THRESHOLD"]
+        self.reset_timeout = app.config["HTTP_BREAKER_RESET"]
+
+        self.session = InstrumentedSession(self)
+        adapter = HTTPAdapter(
+            pool_connections=app.config["HTTP_POOL_CONNECTIONS"],
+            pool_maxsize=app.config["HTTP_POOL_MAXSIZE"],
+            max_retries=0,  # les réessais sont gérés ici, avec deadline et jitter
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        app.extensions["http_client"] = self
+
+    def breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def host_metrics(self, host):
+        with self._lock:
+            if host not in self._metrics:
+                self._metrics[host] = HostMetrics()
+            return self._metrics[host]
+
+    def metrics(self):
+        """Métriques par hôte, avec l'état de son disjoncteur."""
+        with self._lock:
+            hosts = list(self._metrics.items())
+        return {host: {**metrics.snapshot(), "circuit": self.breaker(host).state} for host, metrics in hosts}
+
+    def request(self, method, url, deadline=None, retries=None, **kwargs):
+        """
+        Envoie une requête en respectant un délai total `deadline` (secondes, HTTP_DEADLINE par défaut).
+        Les requêtes idempotentes sont réessayées (`retries` fois au plus) sur erreur réseau, timeout
+        ou réponse 429 / 502 / 503 / 504. Lève une exception requests en cas d'échec.
+        """
+        method = method.upper()
+        retries = self.retries if retries is None else retries
+        if method not in IDEMPOTENT_METHODS:
+            retries = 0
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        host = urlsplit(url).netloc
+
+        attempt = 0
+        while True:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline exceeded for {host}")
+            connect_timeout, read_timeout = self.timeout
+            kwargs["timeout"] = (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                # Réponse abandonnée : rend la connexion au pool avant de réessayer
+                response.close()
+            except CircuitOpenError:
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= retries:
+                    raise
+
+            # Attente exponentielle avec jitter complet, sans dépasser la deadline
+            attempt += 1
+            self.host_metrics(host).incr("retries")
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            time.sleep(max(0, min(delay, expires_at - time.monotonic())))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stripe_client(self, timeout):
+        """Client HTTP de Stripe branché sur la session partagée (pool, disjoncteur, métriques)."""
+        import stripe
+
+        return stripe.RequestsClient(timeout=timeout, session=self.session)
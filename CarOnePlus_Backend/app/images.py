@@ -0,0 +1,199 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import abort, current_app, request, send_file, send_from_directory
+from werkzeug.security import safe_join
+
+from app.storage import is_stored_key
+
+
+# Déclinaisons d'images à la demande (?w=, ?h=, ?fmt=webp).
+# Chaque déclinaison est calculée une seule fois dans un processus séparé puis stockée
+# sur disque ; le dossier est borné en taille (les moins récemment servies sont supprimées).
+
+# Les dimensions demandées sont arrondies au palier supérieur pour limiter le nombre de déclinaisons
+SIZE_STEPS = (64, 128, 256, 384, 512, 768, 1024, 1536, 2048)
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg"), "png": ("PNG", "image/png")}
+SOURCE_FORMATS = {"jpg": "jpeg", "jpeg": "jpeg", "png": "png", "gif": "png"}
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Anciens uploads nommés d'après le fichier envoyé : un nouvel envoi peut remplacer le contenu
+# sous la même URL, donc cache court et revalidation (ETag / Last-Modified)
+MUTABLE_MAX_AGE = 300
+
+# Taille du dossier des déclinaisons : suivie à chaque génération, le dossier n'est parcouru
+# (éviction) que lorsqu'elle dépasse la limite, ou si la dernière mesure est ancienne (les
+# autres processus y écrivent aussi). L'éviction descend sous EVICTION_LOW_WATERMARK de la limite.
+EVICTION_SCAN_INTERVAL = 300  # secondes
+EVICTION_LOW_WATERMARK = 0.9
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}
+_pending_lock = threading.Lock()
+_usage = {"bytes": None, "measured_at": 0.0}
+_usage_lock = threading.Lock()
+
+
+class InvalidImage(ValueError):
+    """Levée lorsque le fichier source n'est pas une image lisible (upload non vérifié, fichier tronqué)."""
+
+
+def _render_derivative(source, target, width, height, image_format):
+    """Exécuté dans le pool de processus : redimensionne `source` et l'écrit atomiquement dans `target`."""
+    from PIL import Image
+
+    unreadable = (OSError, ValueError, Image.DecompressionBombError)
+    try:
+        image = Image.open(source)
+    except unreadable as e:
+        raise InvalidImage(str(e))
+
+    with image:
+        try:
+            image.seek(0)  # première image des GIF animés
+            image.load()
+        except unreadable as e:
+            raise InvalidImage(str(e))
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode == "P":
+            image = image.convert("RGBA")
+        image.thumbnail((width or image.width, height or image.height))
+
+        tmp = f"{target}.{os.getpid()}.tmp"
+        image.save(tmp, format=image_format, quality=82)
+    os.replace(tmp, target)
+    return target
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=current_app.config["IMAGE_RESIZE_WORKERS"])
+        return _executor
+
+
+def _snap(value):
+    if not value or value <= 0:
+        return None
+    for step in SIZE_STEPS:
+        if value <= step:
+            return step
+    return SIZE_STEPS[-1]
+
+
+def _evict(cache_folder, max_bytes, keep):
+    """
+    Mesure le dossier ; s'il dépasse `max_bytes`, supprime les déclinaisons les moins récemment
+    servies (sauf `keep`) jusqu'à EVICTION_LOW_WATERMARK de la limite. Retourne la taille restante.
+    """
+    entries = []
+    total = 0
+    with os.scandir(cache_folder) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+    if total <= max_bytes:
+        return total
+    for _, size, path in sorted(entries):
+        if total <= max_bytes * EVICTION_LOW_WATERMARK:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+    return total
+
+
+def _record_derivative(cache_folder, max_bytes, target):
+    """Ajoute la nouvelle déclinaison à la taille suivie du dossier et lance l'éviction si besoin."""
+    size = os.path.getsize(target)
+    with _usage_lock:
+        stale = _usage["bytes"] is None or time.monotonic() - _usage["measured_at"] > EVICTION_SCAN_INTERVAL
+        if not stale:
+            _usage["bytes"] += size
+            if _usage["bytes"] <= max_bytes:
+                return
+        _usage["bytes"] = _evict(cache_folder, max_bytes, keep=target)
+        _usage["measured_at"] = time.monotonic()
+
+
+def _derivative(source, width, height, fmt):
+    """Retourne le chemin de la déclinaison, en la calculant si elle n'existe pas encore."""
+    cache_folder = current_app.config["IMAGE_CACHE_FOLDER"]
+    stat = os.stat(source)
+    name = hashlib.sha1(f"{source}:{stat.st_mtime_ns}:{stat.st_size}:{width}:{height}:{fmt}".encode("utf-8")).hexdigest()
+    target = os.path.join(cache_folder, f"{name}.{fmt}")
+
+    if os.path.exists(target):
+        os.utime(target)  # marque la déclinaison comme récemment servie (éviction LRU)
+        return target
+
+    os.makedirs(cache_folder, exist_ok=True)
+
+    # Une seule génération pour des requêtes simultanées sur la même déclinaison
+    with _pending_lock:
+        future = _pending.get(target)
+        owner = future is None
+        if owner:
+            future = _get_executor().submit(_render_derivative, source, target, width, height, FORMATS[fmt][0])
+            _pending[target] = future
+    try:
+        future.result(timeout=current_app.config["IMAGE_RESIZE_TIMEOUT"])
+    finally:
+        if owner:
+            with _pending_lock:
+                _pending.pop(target, None)
+
+    if owner:
+        _record_derivative(cache_folder, current_app.config["IMAGE_CACHE_MAX_BYTES"], target)
+    return target
+
+
+def send_image(folder, filename):
+    """
+    Envoie une image de `folder`, éventuellement redimensionnée (?w=, ?h=) et convertie (?fmt=webp).
+    Les fichiers du stockage par contenu (et leurs déclinaisons) sont immuables et mis en cache
+    longtemps par le client ; les anciens uploads, remplaçables, seulement MUTABLE_MAX_AGE secondes.
+    """
+    immutable = is_stored_key(filename)
+    max_age = IMMUTABLE_MAX_AGE if immutable else MUTABLE_MAX_AGE
+
+    width = _snap(request.args.get("w", type=int))
+    height = _snap(request.args.get("h", type=int))
+    fmt = request.args.get("fmt")
+    if fmt is not None and fmt not in FORMATS:
+        abort(400, description=f"Invalid format. Valid formats are: {sorted(FORMATS)}")
+
+    if width is None and height is None and fmt is None:
+        response = send_from_directory(folder, filename, max_age=max_age)
+    else:
+        source = safe_join(folder, filename)
+        if source is None or not os.path.isfile(source):
+            abort(404)
+        if fmt is None:
+            fmt = SOURCE_FORMATS.get(filename.rsplit(".", 1)[-1].lower(), "jpeg")
+        # Le nom de la déclinaison (empreinte de la source et des paramètres) sert d'ETag : il change
+        # quand un ancien upload est remplacé, mais pas quand l'éviction LRU touche le fichier
+        try:
+            target = _derivative(source, width, height, fmt)
+        except InvalidImage:
+            abort(415, description="File is not a valid image")
+        etag = os.path.splitext(os.path.basename(target))[0]
+        response = send_file(target, mimetype=FORMATS[fmt][1], max_age=max_age, etag=etag)
+
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,178 @@
+import codecs
+import csv
+import json
+
+from sqlalchemy import insert
+
+from app.models import Vehicle, db
+
+
+# Import en masse de véhicules (CSV ou NDJSON) pour les propriétaires professionnels.
+# Le fichier est lu ligne par ligne, chaque ligne est validée d'après les colonnes de Vehicle,
+# puis les lignes valides sont insérées par lots (executemany) avec un commit par lot ; les véhicules
+# sans coordonnées sont mis en file de géocodage après chaque lot.
+
+FORMATS = ("csv", "ndjson")
+MAX_REPORTED_ERRORS = 1000
+TRUE_VALUES = {"true", "1", "yes", "oui"}
+FALSE_VALUES = {"false", "0", "no", "non"}
+
+# Colonnes gérées par le serveur, jamais importées
+SERVER_COLUMNS = {"id", "owner_id", "created_at", "updated_at", "rating_sum", "rating_count"}
+
+
+def importable_columns():
+    """Colonnes de Vehicle acceptées dans un fichier d'import, avec leur type Python."""
+    columns = {}
+    for column in Vehicle.__table__.columns:
+        if column.name in SERVER_COLUMNS:
+            continue
+        columns[column.name] = column
+    return columns
+
+
+def _convert(column, value):
+    python_type = column.type.python_type
+    if python_type is bool:
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError("must be a boolean")
+    if python_type is int:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError("must be an integer")
+        if isinstance(value, bool) or not number.is_integer():
+            raise ValueError("must be an integer")
+        return int(number)
+    if python_type is float:
+        try:
+            if isinstance(value, bool):
+                raise ValueError
+            return float(value)
+        except (TypeError, ValueError):
+            raise ValueError("must be a number")
+
+    value = str(value).strip()
+    length = getattr(column.type, "length", None)
+    if length and len(value) > length:
+        raise ValueError(f"must be at most {length} characters")
+    return value
+
+
+def validate_row(raw, columns):
+    """Retourne (valeurs, erreurs) pour une ligne brute (dict)."""
+    values = {}
+    errors = []
+
+    unknown = sorted(set(raw) - set(columns))
+    if unknown:
+        errors.append(f"unknown columns: {', '.join(unknown)}")
+
+    for name, column in columns.items():
+        value = raw.get(name)
+        if value is None or (isinstance(value, str) and value.strip() == ""):
+            if not column.nullable and column.default is None:
+                errors.append(f"{name}: is required")
+            continue
+        try:
+            values[name] = _convert(column, value)
+        except (TypeError, ValueError) as e:
+            errors.append(f"{name}: {e}")
+
+    if "price_per_day" in values and values["price_per_day"] < 0:
+        errors.append("price_per_day: must be positive")
+
+    return values, errors
+
+
+def iter_rows(stream, fmt):
+    """Lit un flux binaire ligne par ligne. Produit (numéro de ligne, dict) ou (numéro, message d'erreur)."""
+    text = codecs.getreader("utf-8-sig")(stream)
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key is not None}
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, "invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "each line must be a JSON object"
+            continue
+        yield line_number, row
+
+
+def import_vehicles(stream, fmt, owner_id, batch_size=500, dry_run=False, on_batch=None):
+    """
+    Importe les véhicules du flux pour `owner_id`.
+    Retourne un rapport : lignes lues, valides, insérées (0 en dry-run), rejetées, et erreurs par ligne.
+    `on_batch(rapport)` est appelé après chaque lot (progression pour la CLI).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format. Valid formats are: {list(FORMATS)}")
+
+    from app import geocoder
+
+    columns = importable_columns()
+    report = {"processed": 0, "valid": 0, "inserted": 0, "rejected": 0, "dry_run": dry_run, "errors": []}
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        if not dry_run:
+            inserted = db.session.execute(insert(Vehicle).returning(Vehicle.id, Vehicle.lat, Vehicle.lng), batch)
+            ungeocoded = [vehicle_id for vehicle_id, lat, lng in inserted if lat is None or lng is None]
+            db.session.commit()
+            report["inserted"] += len(batch)
+            # Coordonnées calculées en arrière-plan, comme pour un véhicule créé un par un
+            if ungeocoded:
+                geocoder.enqueue(ungeocoded)
+        report["valid"] += len(batch)
+        batch.clear()
+        if on_batch is not None:
+            on_batch(report)
+
+    try:
+        for line_number, row in iter_rows(stream, fmt):
+            report["processed"] += 1
+            if isinstance(row, str):
+                errors = [row]
+            else:
+                values, errors = validate_row(row, columns)
+
+            if errors:
+                report["rejected"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({"line": line_number, "errors": errors})
+                continue
+
+            values.setdefault("available", True)
+            values["owner_id"] = owner_id
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    except UnicodeDecodeError:
+        db.session.rollback()
+        report["errors"].append({"line": None, "errors": ["file must be UTF-8 encoded"]})
+
+    if report["inserted"]:
+        # De nouveaux véhicules peuvent apparaître dans n'importe quelle liste en cache
+        from app import cache
+        from app.routes.vehicles import FILTERS_TAG
+
+        cache.invalidate_tags(cache.tags(FILTERS_TAG))
+
+    return report
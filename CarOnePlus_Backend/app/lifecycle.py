@@ -0,0 +1,168 @@
+import logging
+import os
+import socket
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app import cache
+from app.models import Reservation, SchedulerLease, db
+
+
+# Cycle de vie des réservations, exécuté par un seul processus (`flask scheduler run`) :
+# - EN ATTENTE sans paiement depuis RESERVATION_PENDING_TTL (ou dont le début est passé) -> EXPIRER ;
+# - CONFIRMER / EN COURS dont la fin est passée -> TERMINER ;
+# - CONFIRMER dont le début est arrivé -> EN COURS.
+# `vehicle.available` n'est pas touché : c'est le choix du propriétaire, les dates louées sont
+# bloquées par les réservations elles-mêmes.
+# Chaque étape est un UPDATE ensembliste ; le passage complet tient dans une transaction.
+# L'élection du leader repose sur un bail en base (table scheduler_lease), valable avec
+# plusieurs hôtes gunicorn et quel que soit le moteur.
+# Le planificateur tourne dans son propre processus : ses invalidations de cache (calendriers,
+# listes filtrées sur des dates) n'atteignent les workers web qu'avec le cache Redis
+# (CACHE_REDIS_URL). Avec le cache mémoire, les entrées expirent seulement à leur TTL
+# (CALENDAR_CACHE_TTL pour les calendriers).
+
+logger = logging.getLogger(__name__)
+
+LIFECYCLE_LEASE = "reservation-lifecycle"
+ACTIVE_STATUSES = ("CONFIRMER", "EN COURS")
+
+
+def acquire_lease(name, holder, ttl):
+    """
+    Prend ou renouvelle le bail `name` pour `holder` pendant `ttl` secondes.
+    Retourne False si un autre détenteur a un bail en cours. Commit la session.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+
+    renewed = db.session.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name, (SchedulerLease.holder == holder) | (SchedulerLease.expires_at < now))
+        .values(holder=holder, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if renewed:
+        db.session.commit()
+        return True
+
+    # Premier passage : le bail n'existe pas encore (un seul INSERT peut réussir)
+    db.session.add(SchedulerLease(name=name, holder=holder, expires_at=expires_at))
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def release_lease(name, holder):
+    """Rend le bail pour qu'un autre processus prenne le relais sans attendre son expiration."""
+    db.session.query(SchedulerLease).filter_by(name=name, holder=holder).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _set_status(status, *conditions):
+    """UPDATE ensembliste du statut ; retourne (vehicle_id, start_date, end_date) des réservations modifiées."""
+    return db.session.execute(
+        update(Reservation)
+        .where(*conditions)
+        .values(status=status)
+        .returning(Reservation.vehicle_id, Reservation.start_date, Reservation.end_date)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def pending_expires_at(reservation):
+    """
+    Instant (UTC, naïf) à partir duquel `run_lifecycle` expire la réservation EN ATTENTE :
+    RESERVATION_PENDING_TTL après sa création, ou à la fin du jour de début (heure locale).
+    """
+    created_at = reservation.created_at or datetime.utcnow()
+    ttl_deadline = created_at + timedelta(seconds=current_app.config["RESERVATION_PENDING_TTL"])
+    start_deadline = (
+        datetime.combine(reservation.start_date + timedelta(days=1), datetime.min.time())
+        .astimezone(timezone.utc)
+        .replace(tzinfo=None)
+    )
+    return min(ttl_deadline, start_deadline)
+
+
+def run_lifecycle(today=None, now=None):
+    """
+    Un passage du cycle de vie, en une transaction.
+    Retourne les compteurs {expired, completed, started}.
+    """
+    from app.routes.vehicles import invalidate_vehicle_availability
+
+    today = today or date.today()
+    now = now or datetime.utcnow()
+    pending_deadline = now - timedelta(seconds=current_app.config["RESERVATION_PENDING_TTL"])
+
+    expired = _set_status(
+        "EXPIRER",
+        Reservation.status == "EN ATTENTE",
+        (Reservation.created_at < pending_deadline) | (Reservation.start_date < today),
+    )
+    completed = _set_status("TERMINER", Reservation.status.in_(ACTIVE_STATUSES), Reservation.end_date < today)
+    started = _set_status("EN COURS", Reservation.status == "CONFIRMER", Reservation.start_date <= today)
+
+    db.session.commit()
+
+    for vehicle_id, start_date, end_date in expired + completed:
+        invalidate_vehicle_availability(vehicle_id, start_date, end_date)
+
+    return {"expired": len(expired), "completed": len(completed), "started": len(started)}
+
+
+scheduler_cli = AppGroup("scheduler", help="Tâches planifiées (cycle de vie des réservations).")
+
+
+@scheduler_cli.command("run")
+@click.option("--once", is_flag=True, help="Un seul passage, puis sortie.")
+@click.option("--interval", type=int, help="Secondes entre deux passages (SCHEDULER_INTERVAL par défaut).")
+def scheduler_run(once, interval):
+    """
+    Exécute le cycle de vie des réservations à intervalle régulier. Peut tourner sur chaque hôte :
+    seul le détenteur du bail travaille, les autres attendent et prennent le relais s'il disparaît.
+    """
+    interval = interval or current_app.config["SCHEDULER_INTERVAL"]
+    lease_ttl = max(current_app.config["SCHEDULER_LEASE_TTL"], 2 * interval)
+    holder = f"{socket.gethostname()}:{os.getpid()}"
+    if not cache.shared:
+        click.echo(
+            "Warning: in-process cache, the web workers will not see this scheduler's invalidations "
+            "(set CACHE_REDIS_URL); cached calendars stay stale until they expire", err=True,
+        )
+
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                if acquire_lease(LIFECYCLE_LEASE, holder, lease_ttl):
+                    stats = run_lifecycle()
+                    click.echo(
+                        f"{stats['expired']} expired, {stats['started']} started, {stats['completed']} completed "
+                        f"in {time.monotonic() - started:.2f}s"
+                    )
+                elif once:
+                    click.echo("Another process holds the scheduler lease")
+            except Exception:
+                logger.exception("Reservation lifecycle run failed")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+            if once:
+                break
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        release_lease(LIFECYCLE_LEASE, holder)
@@ -14,6 +14,11 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=False)  # ✅ Nouveau champ
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
+    @property
+    def is_admin(self):
+        """Administrateurs / exploitation : rôle attribué en base, jamais à l'inscription."""
+        return self.role == "admin"
+
     def set_password(self, password):
         self.password = bcrypt.generate_password_hash(password).decode('utf-8')
 
@@ -49,6 +54,10 @@ class PasswordResetCode(db.Model):
     user = db.relationship('User', backref=db.backref('reset_codes', cascade='all, delete-orphan'))
 
    
+# Note moyenne utilisée pour le tri ; doit rester identique à l'index ix_vehicle_available_rating
+VEHICLE_RATING_SQL = "coalesce(rating_sum / nullif(rating_count, 0), 0)"
+
+
 class Vehicle(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
@@ -66,32 +75,92 @@ class Vehicle(db.Model):
     lat = db.Column(db.Float, nullable=True)  # Latitude
     lng = db.Column(db.Float, nullable=True)  # Longitude
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())  # sert d'ETag / Last-Modified
+    # Agrégats des avis, tenus à jour à chaque écriture d'avis (évite un AVG / COUNT par lecture)
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Index composites des tris du catalogue (filtre `available` en tête, id pour départager)
+    __table_args__ = (
+        db.Index('ix_vehicle_available_id', 'available', 'id'),
+        db.Index('ix_vehicle_available_price', 'available', 'price_per_day', 'id'),
+        db.Index('ix_vehicle_available_rating', 'available', db.text(VEHICLE_RATING_SQL), 'id'),
+        db.Index('ix_vehicle_available_lat_lng', 'available', 'lat', 'lng'),
+        db.Index('ix_vehicle_lat_lng', 'lat', 'lng'),  # boîte englobante de /geo/nearby
+        db.Index('ix_vehicle_owner_id', 'owner_id'),  # véhicules (et réservations) d'un propriétaire
+    )
 
     owner = db.relationship('User', backref=db.backref('vehicles', cascade='all, delete-orphan'))
     images = db.relationship('VehicleImage', backref='vehicle', cascade='all, delete-orphan', lazy=True)
 
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
 
 class VehicleImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id', ondelete='CASCADE'), nullable=False)
-    file_name = db.Column(db.String(200), nullable=False, unique= True)
+    file_name = db.Column(db.String(200), nullable=False)  # clé du fichier dans le stockage (StoredFile.key)
     file_path = db.Column(db.String(500), nullable=False)
     uploaded_at = db.Column(db.DateTime, server_default=db.func.now())
 
+    __table_args__ = (db.UniqueConstraint('vehicle_id', 'file_name', name='uq_vehicle_image_vehicle_file'),)
+
     #vehicle = db.relationship('Vehicle', backref=db.backref('vehicule_images', cascade='all, delete-orphan'))
 
+class StoredFile(db.Model):
+    """Fichier stocké par contenu (sha256), partagé par toutes les images qui le référencent."""
+    key = db.Column(db.String(80), primary_key=True)  # "<sha256>.<extension>"
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+
+class GeocodeCache(db.Model):
+    """Résultat de géocodage d'une adresse normalisée ; lat / lng vides pour une adresse introuvable."""
+    key = db.Column(db.String(40), primary_key=True)  # sha1 de l'adresse normalisée
+    address = db.Column(db.Text, nullable=False)
+    lat = db.Column(db.Float, nullable=True)
+    lng = db.Column(db.Float, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+# Cycle de vie : EN ATTENTE -> CONFIRMER (paiement) -> EN COURS -> TERMINER ;
+# une réservation EN ATTENTE jamais payée passe à EXPIRER (voir app/lifecycle.py)
+RESERVATION_STATUSES = ("EN ATTENTE", "CONFIRMER", "EN COURS", "TERMINER", "EXPIRER")
+
+# Statuts qui rendent le véhicule indisponible sur la période réservée
+BLOCKING_RESERVATION_STATUSES = ("CONFIRMER", "EN ATTENTE", "EN COURS")
+
+
 class Reservation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id', ondelete='CASCADE'), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
-    status = db.Column(db.String(20), default="EN ATTENTE")  # Statuts : pending, confirmed, in_progress, completed, cancelled
+    status = db.Column(db.String(20), default="EN ATTENTE")  # Statuts : voir RESERVATION_STATUSES
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
+    # Recherche de disponibilité : chevauchement de dates par véhicule ; historique par locataire
+    __table_args__ = (
+        db.Index('ix_reservation_vehicle_dates_status', 'vehicle_id', 'start_date', 'end_date', 'status'),
+        db.Index('ix_reservation_user_start', 'user_id', 'start_date'),  # historique d'un locataire
+    )
+
     user = db.relationship('User', backref=db.backref('user-reservations', cascade='all, delete-orphan'))
     vehicle = db.relationship('Vehicle', backref=db.backref('vehicules-reservations', cascade='all, delete-orphan'))
 
+class SchedulerLease(db.Model):
+    """Bail d'une tâche planifiée : seul son détenteur l'exécute jusqu'à `expires_at` (élection du leader)."""
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     reservation_id = db.Column(db.Integer, db.ForeignKey('reservation.id', ondelete='CASCADE'), nullable=False)
@@ -107,10 +176,11 @@ class Payment(db.Model):
 class Review(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
-    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id', ondelete='CASCADE'), nullable=False)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id', ondelete='CASCADE'), nullable=False, index=True)
     rating = db.Column(db.Float, nullable=False)  # Note entre 1 et 5
     comment = db.Column(db.Text, nullable=True)  # Commentaire facultatif
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
 
     user = db.relationship('User', backref=db.backref('user-reviews', cascade='all, delete-orphan'))
     vehicle = db.relationship('Vehicle', backref=db.backref('vehicule-reviews', cascade='all, delete-orphan'))
@@ -0,0 +1,132 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import current_app, request
+from sqlalchemy import and_, or_
+
+
+DEFAULT_PAGE_SIZE = 10
+
+
+class InvalidCursor(ValueError):
+    """Levée lorsqu'un curseur de pagination est illisible ou ne correspond pas au tri demandé."""
+
+
+def get_page_size(default=DEFAULT_PAGE_SIZE):
+    """Lit le paramètre `limit` et le borne à MAX_PAGE_SIZE."""
+    limit = request.args.get("limit", default=default, type=int)
+    return max(1, min(limit, current_app.config["MAX_PAGE_SIZE"]))
+
+
+def wants_total(default=False):
+    """Le total (COUNT) n'est calculé que si le client le demande avec `with_total`."""
+    value = request.args.get("with_total")
+    if value is None:
+        return default
+    return value.lower() in ["true", "1", "yes"]
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _python_type(expr):
+    try:
+        return expr.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def _from_json(value, expr):
+    if value is None:
+        return None
+    python_type = _python_type(expr)
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    return value
+
+
+def encode_cursor(sort_key, values):
+    """Encode un curseur opaque à partir du nom du tri et des valeurs de la dernière ligne."""
+    payload = json.dumps({"s": sort_key, "v": [_to_json(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _read_cursor(token):
+    """Retourne (nom du tri, valeurs) d'un curseur."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return payload.get("s"), payload["v"]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def cursor_sort_key(token):
+    """Nom du tri pour lequel le curseur a été émis (None si le curseur est illisible)."""
+    try:
+        return _read_cursor(token)[0]
+    except InvalidCursor:
+        return None
+
+
+def decode_cursor(token, sort_key, order_by):
+    """Décode un curseur et vérifie qu'il a été émis pour le même tri."""
+    cursor_sort, values = _read_cursor(token)
+
+    if cursor_sort != sort_key or len(values) != len(order_by):
+        raise InvalidCursor("Cursor does not match the requested sort")
+
+    return [_from_json(value, expr) for value, (expr, _) in zip(values, order_by)]
+
+
+def keyset_filter(order_by, values):
+    """
+    Condition "après la ligne du curseur" pour un tri lexicographique.
+    `order_by` est une liste de (expression, "asc" | "desc").
+    """
+    clauses = []
+    for i, (expr, direction) in enumerate(order_by):
+        equal_prefix = [prev_expr == values[j] for j, (prev_expr, _) in enumerate(order_by[:i])]
+        step = expr > values[i] if direction == "asc" else expr < values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def order_clauses(order_by):
+    return [expr.asc() if direction == "asc" else expr.desc() for expr, direction in order_by]
+
+
+def paginate_keyset(query, order_by, sort_key, cursor, limit, row_values=None):
+    """
+    Pagination par curseur : on se positionne directement après la dernière ligne vue
+    au lieu de parcourir et jeter `offset` lignes.
+
+    `row_values` extrait les valeurs de tri d'une ligne (par défaut les attributs
+    portant le nom des colonnes). Retourne (lignes, next_cursor).
+    """
+    if cursor:
+        query = query.filter(keyset_filter(order_by, decode_cursor(cursor, sort_key, order_by)))
+
+    rows = query.order_by(*order_clauses(order_by)).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        if row_values is None:
+            last = rows[-1]
+            values = [getattr(last, expr.key) for expr, _ in order_by]
+        else:
+            values = row_values(rows[-1])
+        next_cursor = encode_cursor(sort_key, values)
+
+    return rows, next_cursor
@@ -5,7 +5,9 @@ from app.models import User, UserImage, db, RevokedToken, PasswordResetCode
 import os
 from flask_mail import Message
 from itsdangerous import URLSafeTimedSerializer
-from app import mail
+from app import mail, storage
+from app.storage import FileTooLarge, is_stored_key
+from app.images import send_image
 import random
 from datetime import timedelta
 
@@ -260,7 +262,9 @@ def profile():
 
 @bp.route('/images/<filename>')
 def get_image(filename):
-    return send_from_directory(os.path.join(os.getcwd(), UPLOAD_FOLDER), filename)
+    if is_stored_key(filename):
+        return send_image(os.path.dirname(storage.path(filename)), filename)
+    return send_image(os.path.join(os.getcwd(), UPLOAD_FOLDER), filename)
 
 ### ✅ Upload d'image de profil
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 Mo
@@ -283,18 +287,11 @@ def upload_photo():
         return jsonify({"message": "No file selected"}), 400
 
     if file and allowed_file(file.filename):
-        if len(file.read()) > MAX_FILE_SIZE:  # Vérifie la taille du fichier
+        # Stockage par contenu : la taille est vérifiée pendant la copie
+        try:
+            filename, file_path = storage.save(file.stream, file.filename.rsplit(".", 1)[1], max_size=MAX_FILE_SIZE)
+        except FileTooLarge:
             return jsonify({"message": "File is too large (max 5MB)"}), 400
-        file.seek(0)  # Revenir au début du fichier après lecture
-
-        filename = secure_filename(file.filename)
-        
-        # Vérifier et créer le dossier si nécessaire
-        if not os.path.exists(UPLOAD_FOLDER):
-            os.makedirs(UPLOAD_FOLDER)
-
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
 
         user_image = UserImage(user_id=user.id, file_name=filename, file_path=file_path)
         db.session.add(user_image)
@@ -389,7 +386,8 @@ def delete_account():
     # Supprimer toutes les images associées à l'utilisateur
     user_images = UserImage.query.filter_by(user_id=user.id).all()
     for img in user_images:
-        if os.path.exists(img.file_path):
+        # Les fichiers du stockage par contenu sont partagés : ils sont libérés par `flask storage gc`
+        if not is_stored_key(img.file_name) and os.path.exists(img.file_path):
             os.remove(img.file_path)
         db.session.delete(img)
 
@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify, current_app
-import requests
+import json
 from app.models import Vehicle, db
+from app import cache, geocoder
+from app.geocoding import GeocodingError
+from app.geo import GRID_CELLS, cell_index_exprs, tile_bounds, tiles_for_bbox, within_radius
+from app.cache import cache_key
+from app.pagination import InvalidCursor, get_page_size, paginate_keyset
+from app.routes.vehicles import (
+    InvalidFilter, bookable_between, invalidate_vehicle_listings, parse_date_range, serialize_vehicles,
+    vehicle_snapshot,
+)
+from datetime import date
 
 bp = Blueprint("geo", __name__, url_prefix="/geo")
 
-# Route : Convertir une adresse en coordonnées géographiques
+# Route : Convertir une adresse en coordonnées géographiques (résultats mis en cache, voir app/geocoding.py)
 @bp.route("/geocode", methods=["POST"])
 def geocode():
     data = request.get_json()
@@ -14,27 +24,24 @@ def geocode():
     if not address or not vehicle_id:
         return jsonify({"error": "Address and vehicle_id are required"}), 400
 
-    api_key = current_app.config["GOOGLE_MAPS_API_KEY"]
-    url = f"https://maps.googleapis.com/maps/api/geocode/json?address={address}&key={api_key}"
-
-    response = requests.get(url)
-    if response.status_code != 200:
-        return jsonify({"error": "Failed to fetch geocode data"}), response.status_code
-
-    data = response.json()
-    if data["status"] != "OK":
-        return jsonify({"error": data["status"]}), 400
-
-    location = data["results"][0]["geometry"]["location"]
+    try:
+        position = geocoder.geocode(address)
+    except GeocodingError as e:
+        current_app.logger.warning("Geocoding failed for %r: %s", address, e)
+        return jsonify({"error": "Failed to fetch geocode data"}), 502
+    if position is None:
+        return jsonify({"error": "ZERO_RESULTS"}), 400
 
     # Mettre à jour les coordonnées du véhicule
     vehicle = Vehicle.query.get(vehicle_id)
     if not vehicle:
         return jsonify({"error": "Vehicle not found"}), 404
 
-    vehicle.lat = location["lat"]
-    vehicle.lng = location["lng"]
+    before = vehicle_snapshot(vehicle)
+    vehicle.lat, vehicle.lng = position
+    after = vehicle_snapshot(vehicle)
     db.session.commit()
+    invalidate_vehicle_listings(before, after)
 
     return jsonify({
         "message": "Coordinates updated successfully",
@@ -44,35 +51,190 @@ def geocode():
     }), 200
 
 # Route : Trouver des véhicules proches
+MAX_NEARBY_RADIUS_KM = 200
+
+
+def parse_position(args):
+    """Lit lat / lng ; retourne (lat, lng) ou None s'ils sont absents ou hors limites."""
+    lat = args.get("lat", type=float)
+    lng = args.get("lng", type=float)
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def nearby_page(query, lat, lng, radius):
+    """
+    Page de véhicules triés par distance (puis id) avec pagination par curseur.
+    Une requête pour la page (boîte englobante + haversine + tri) et une pour les images.
+    """
+    query, distance = within_radius(query, lat, lng, radius)
+    order_by = [(distance, "asc"), (Vehicle.id, "asc")]
+    limit = get_page_size()
+
+    rows, next_cursor = paginate_keyset(
+        query.add_columns(distance.label("distance_km")),
+        order_by,
+        f"nearby:{lat}:{lng}:{radius}",  # le curseur n'est valable que pour la même recherche
+        request.args.get("cursor"),
+        limit,
+        row_values=lambda row: [row[1], row[0].id],
+    )
+
+    vehicles = serialize_vehicles([row[0] for row in rows])
+    for vehicle, row in zip(vehicles, rows):
+        vehicle["distance_km"] = round(row[1], 3)
+
+    return {"limit": limit, "next_cursor": next_cursor, "vehicles": vehicles}
+
+
 @bp.route("/nearby", methods=["GET"])
 def nearby():
-    lat = request.args.get("lat", type=float)
-    lng = request.args.get("lng", type=float)
-    radius = request.args.get("radius", default=5, type=int)  # Rayon en kilomètres
+    """Véhicules dans un rayon (km) autour de lat / lng, du plus proche au plus lointain."""
+    position = parse_position(request.args)
+    if position is None:
+        return jsonify({"error": "Latitude and longitude are required"}), 400
 
-    if not lat or not lng:
+    radius = request.args.get("radius", default=5, type=float)  # Rayon en kilomètres
+    if not 0 < radius <= MAX_NEARBY_RADIUS_KM:
+        return jsonify({"error": f"radius must be between 0 and {MAX_NEARBY_RADIUS_KM} km"}), 400
+
+    try:
+        return jsonify(nearby_page(Vehicle.query, *position, radius)), 200
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Route : Véhicules libres sur une période autour d'une position ("voitures libres près de moi ce week-end")
+@bp.route("/available", methods=["GET"])
+def available_nearby():
+    """
+    Véhicules mis en ligne et sans réservation bloquante entre `start_date` et `end_date`,
+    dans un rayon autour de lat / lng, du plus proche au plus lointain (pagination par curseur).
+    Une seule requête : boîte englobante + haversine + anti-jointure sur les réservations.
+    """
+    position = parse_position(request.args)
+    if position is None:
         return jsonify({"error": "Latitude and longitude are required"}), 400
 
-    # Filtrer les véhicules dans le rayon spécifié
-    query = db.session.query(Vehicle).filter(
-        Vehicle.lat.isnot(None),
-        Vehicle.lng.isnot(None)
-    ).filter(
-        db.func.pow(Vehicle.lat - lat, 2) + db.func.pow(Vehicle.lng - lng, 2) <= db.func.pow(radius / 111, 2)
+    radius = request.args.get("radius", default=5, type=float)  # Rayon en kilomètres
+    if not 0 < radius <= MAX_NEARBY_RADIUS_KM:
+        return jsonify({"error": f"radius must be between 0 and {MAX_NEARBY_RADIUS_KM} km"}), 400
+
+    try:
+        start_date, end_date = parse_date_range(request.args)
+        if start_date is None:
+            return jsonify({"error": "start_date and end_date are required"}), 400
+
+        query = bookable_between(date.fromisoformat(start_date), date.fromisoformat(end_date))
+        return jsonify(nearby_page(query, *position, radius)), 200
+    except (InvalidCursor, InvalidFilter) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Route : Regroupement des véhicules disponibles pour la carte
+MAX_ZOOM = 20
+CLUSTER_MAX_ZOOM = 14  # au-delà, les véhicules sont renvoyés un par un
+MAX_TILES = 64
+MAX_MAP_VEHICLES = 500
+CLUSTERS_CACHE_TTL = 60  # secondes
+
+
+def parse_bbox(value):
+    """bbox=min_lng,min_lat,max_lng,max_lat (ordre GeoJSON) ; None si invalide."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in (value or "").split(","))
+    except ValueError:
+        return None
+    if not (-180 <= min_lng <= max_lng <= 180 and -90 <= min_lat <= max_lat <= 90):
+        return None
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def bbox_filter(min_lng, min_lat, max_lng, max_lat):
+    return (
+        Vehicle.available.is_(True),
+        Vehicle.lat.between(min_lat, max_lat),
+        Vehicle.lng.between(min_lng, max_lng),
     )
 
-    vehicles = query.all()
-    results = [
-        {
-            "id": v.id,
-            "title": v.title,
-            "description": v.description,
-            "price_per_day": v.price_per_day,
-            "available": v.available,
-            "lat": v.lat,
-            "lng": v.lng
-        }
-        for v in vehicles
-    ]
-
-    return jsonify(results), 200
+
+def compute_tile_clusters(tiles, zoom):
+    """
+    Regroupe par cellule les véhicules disponibles des tuiles demandées, en une seule requête GROUP BY
+    sur la boîte qui les contient (index ix_vehicle_available_lat_lng). Retourne {tuile: [groupes]}.
+    """
+    bounds = [tile_bounds(x, y, zoom) for x, y in tiles]
+    box = (min(b[0] for b in bounds), min(b[1] for b in bounds), max(b[2] for b in bounds), max(b[3] for b in bounds))
+    column, row = cell_index_exprs(zoom)
+
+    rows = db.session.query(
+        column, row, db.func.count(Vehicle.id), db.func.avg(Vehicle.lat), db.func.avg(Vehicle.lng), db.func.min(Vehicle.id)
+    ).filter(*bbox_filter(*box)).group_by(column, row).all()
+
+    last_tile = 2 ** zoom - 1
+    clusters = {tile: [] for tile in tiles}
+    for cell_x, cell_y, count, lat, lng, first_id in rows:
+        tile = (min(int(cell_x) // GRID_CELLS, last_tile), min(int(cell_y) // GRID_CELLS, last_tile))
+        if tile not in clusters:
+            continue  # tuile déjà en cache, incluse dans la boîte englobante
+        cluster = {"lat": lat, "lng": lng, "count": count}
+        if count == 1:
+            cluster["vehicle_id"] = first_id
+        clusters[tile].append(cluster)
+    return clusters
+
+
+@bp.route("/clusters", methods=["GET"])
+def clusters():
+    """
+    Véhicules disponibles dans `bbox` (min_lng,min_lat,max_lng,max_lat) au niveau `zoom` :
+    nombre et centre de chaque cellule de la grille, ou les véhicules eux-mêmes à fort zoom.
+    """
+    bbox = parse_bbox(request.args.get("bbox"))
+    if bbox is None:
+        return jsonify({"error": "bbox must be min_lng,min_lat,max_lng,max_lat"}), 400
+    zoom = request.args.get("zoom", type=int)
+    if zoom is None or not 0 <= zoom <= MAX_ZOOM:
+        return jsonify({"error": f"zoom must be between 0 and {MAX_ZOOM}"}), 400
+
+    try:
+        if zoom > CLUSTER_MAX_ZOOM:
+            rows = db.session.query(
+                Vehicle.id, Vehicle.title, Vehicle.price_per_day, Vehicle.lat, Vehicle.lng
+            ).filter(*bbox_filter(*bbox)).order_by(Vehicle.id).limit(MAX_MAP_VEHICLES).all()
+            return jsonify({"zoom": zoom, "vehicles": [row._asdict() for row in rows]}), 200
+
+        tiles = tiles_for_bbox(*bbox, zoom)
+        if len(tiles) > MAX_TILES:
+            return jsonify({"error": "bbox is too large for this zoom level"}), 400
+
+        keys = {tile: cache_key("clusters", {"zoom": zoom, "tile": tile}) for tile in tiles}
+        result = {}
+        missing = []
+        for tile, key in keys.items():
+            body = cache.get(key)
+            if body is None:
+                missing.append(tile)
+            else:
+                result[tile] = json.loads(body)
+
+        if missing:
+            for tile, tile_clusters in compute_tile_clusters(missing, zoom).items():
+                cache.set(keys[tile], json.dumps(tile_clusters), ttl=CLUSTERS_CACHE_TTL)
+                result[tile] = tile_clusters
+
+        min_lng, min_lat, max_lng, max_lat = bbox
+        visible = [
+            cluster
+            for tile in tiles
+            for cluster in result[tile]
+            if min_lat <= cluster["lat"] <= max_lat and min_lng <= cluster["lng"] <= max_lng
+        ]
+        return jsonify({"zoom": zoom, "clusters": visible}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,7 +1,20 @@
-from flask import Blueprint
+from flask import Blueprint, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from app import db, http_client
+from app.models import User
 
 bp = Blueprint("home", __name__)  # pas de url_prefix ici
 
 @bp.route("/")
 def index():
     return "Bienvenue sur CarOnePlus 🚗"
+
+
+@bp.route("/metrics/http")
+@jwt_required()
+def http_metrics():
+    """Latences, erreurs et état du disjoncteur des appels sortants, par hôte (process courant). Réservé aux admins."""
+    user = db.session.get(User, get_jwt_identity())
+    if user is None or not user.is_admin:
+        return jsonify({"error": "Unauthorized access"}), 403
+    return jsonify(http_client.metrics()), 200
@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import Payment, Reservation, Vehicle, VehicleImage, User, db
+from app.booking import quote_reservation
+from app.routes.vehicles import invalidate_vehicle_availability
+from app.lifecycle import pending_expires_at
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
 
 import os
 from werkzeug.utils import secure_filename
@@ -13,6 +19,12 @@ import stripe
 
 bp = Blueprint("payments", __name__, url_prefix="/payments")
 
+# Durée de vie d'une session Checkout imposée par Stripe, et marge avant l'expiration de la
+# réservation (le paiement doit aboutir avant que le planificateur ne la passe en EXPIRER)
+STRIPE_SESSION_MIN_TTL = timedelta(minutes=30)
+STRIPE_SESSION_MAX_TTL = timedelta(hours=24)
+STRIPE_SESSION_MARGIN = timedelta(minutes=5)
+
 @bp.route("/create-session", methods=["POST"])
 @jwt_required()
 def create_payment_session():
@@ -28,6 +40,23 @@ def create_payment_session():
     reservation = Reservation.query.get(reservation_id)
     if not reservation or reservation.user_id != user_id:
         return jsonify({"message": "Invalid reservation"}), 400
+    if reservation.status != "EN ATTENTE":
+        return jsonify({"message": "Reservation can no longer be paid"}), 400
+
+    # Le montant est calculé par le serveur (même calcul que /reservations/quote) ;
+    # celui envoyé par le client doit lui correspondre
+    quote = quote_reservation(reservation)
+    if quote is None:
+        return jsonify({"message": "Vehicle not found"}), 404
+    if amount is not None and (not isinstance(amount, (int, float)) or abs(amount - quote["total"]) > 0.01):
+        return jsonify({"message": "Amount does not match the reservation price", "amount": quote["total"]}), 400
+    amount = quote["total"]
+
+    # La session expire avant la réservation : un paiement ne peut pas arriver après son expiration
+    now = datetime.utcnow()
+    expires_at = min(pending_expires_at(reservation) - STRIPE_SESSION_MARGIN, now + STRIPE_SESSION_MAX_TTL)
+    if expires_at < now + STRIPE_SESSION_MIN_TTL:
+        return jsonify({"message": "Reservation expires too soon to be paid, please book again"}), 400
 
     # Créez une session Stripe
     session = stripe.checkout.Session.create(
@@ -36,13 +65,14 @@ def create_payment_session():
             "price_data": {
                 "currency": "eur",
                 "product_data": {"name": f"Reservation {reservation_id}"},
-                "unit_amount": int(amount * 100),  # Stripe utilise des centimes
+                "unit_amount": int(round(amount * 100)),  # Stripe utilise des centimes
             },
             "quantity": 1,
         }],
         mode="payment",
-        success_url=url_for("payment.success", _external=True),
-        cancel_url=url_for("payment.cancel", _external=True),
+        expires_at=int((expires_at - datetime(1970, 1, 1)).total_seconds()),
+        success_url=url_for("payments.success", _external=True),
+        cancel_url=url_for("payments.cancel", _external=True),
         metadata={
             "reservation_id": reservation_id,
             "user_id": user_id
@@ -96,8 +126,42 @@ def webhook():
         amount = session["amount_total"] / 100  # Convertir en euros
 
         reservation = Reservation.query.filter_by(id=reservation_id).first()
-        vehicleId = int(reservation.vehicle_id)
-        vehicle = Vehicle.query.filter_by(id=vehicleId).first()
+        if not reservation:
+            return jsonify({"message": "Reservation not found"}), 404
+
+        # Seule une réservation encore EN ATTENTE est confirmée (UPDATE conditionnel : le
+        # planificateur a pu l'expirer entre-temps, et ses dates être reprises)
+        try:
+            confirmed = db.session.execute(
+                update(Reservation)
+                .where(Reservation.id == reservation.id, Reservation.status == "EN ATTENTE")
+                .values(status="CONFIRMER")
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        except IntegrityError:
+            db.session.rollback()
+            confirmed = 0
+
+        if not confirmed:
+            db.session.refresh(reservation)
+            already_refunded = Payment.query.filter(
+                Payment.reservation_id == reservation.id, Payment.status.in_(("refunded", "refund_failed"))
+            ).first()
+            if reservation.status in ("CONFIRMER", "EN COURS", "TERMINER") or already_refunded:
+                # Stripe renvoie le même événement : rien à refaire
+                return jsonify({"message": "Webhook already processed"}), 200
+
+            # Paiement arrivé après l'expiration (ou dates reprises) : on rembourse, ou on le signale s'il échoue
+            status = "refunded"
+            try:
+                stripe.Refund.create(payment_intent=session["payment_intent"])
+            except stripe.error.StripeError as e:
+                print(f"⚠️  Refund failed for expired reservation {reservation_id}: {e}")
+                status = "refund_failed"
+            db.session.add(Payment(reservation_id=reservation.id, user_id=user_id, amount=amount, status=status))
+            db.session.commit()
+            print(f"Payment for expired reservation {reservation_id} {status}")
+            return jsonify({"message": "Reservation expired, payment " + status}), 200
 
         # Enregistrer le paiement dans la base de données
         payment = Payment(
@@ -107,13 +171,12 @@ def webhook():
             status="succeeded"
         )
 
-        reservation.status = "CONFIRMER"
-        vehicle.available = False
-        
+        # Les dates payées sont bloquées par la réservation elle-même ; `vehicle.available` reste
+        # le choix du propriétaire (mis en ligne ou retiré), sinon le véhicule disparaîtrait
+        # aussi des recherches sur d'autres dates
         db.session.add(payment)
         db.session.commit()
-
-        
+        invalidate_vehicle_availability(reservation.vehicle_id, reservation.start_date, reservation.end_date)
 
         print(f"Payment recorded for reservation {reservation_id} by user {user_id}")
 
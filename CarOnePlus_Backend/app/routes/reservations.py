@@ -1,8 +1,14 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import func, select
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Reservation, Vehicle, VehicleImage, User, db
-from datetime import datetime
+from app.models import RESERVATION_STATUSES, Reservation, Vehicle, VehicleImage, User, db
+from datetime import date, datetime
+from urllib.parse import quote
 from dateutil import parser  # Ajoute cette librairie pour gérer plusieurs formats
+from sqlalchemy.exc import IntegrityError
+from app.routes.vehicles import invalidate_vehicle_availability, vehicle_image_url_prefix
+from app.booking import ReservationConflict, book_vehicle, is_overlap_violation, quote_vehicles
+from app.pagination import InvalidCursor, get_page_size, paginate_keyset
 
 bp = Blueprint("reservations", __name__, url_prefix="/reservations")
 
@@ -38,31 +44,15 @@ def create_reservation():
     if not vehicle:
         return jsonify({"message": "Vehicle not found"}), 404
 
-    # Récupérer toutes les réservations existantes pour ce véhicule
-    existing_reservations = Reservation.query.filter(
-        Reservation.vehicle_id == vehicle.id,
-        Reservation.start_date <= end_date,
-        Reservation.end_date >= start_date
-    ).all()
-
-    for reservation in existing_reservations:
-        if reservation.status == "CONFIRMER":
-            return jsonify({"message": "Vehicle is already booked for the selected dates"}), 400
-        elif reservation.status == "EN ATTENTE":
-            # Vérifier si les dates se chevauchent
-            if not (end_date < reservation.start_date or start_date > reservation.end_date):
-                return jsonify({"message": "A pending reservation already exists for these dates"}), 400
-
-    # Si tout est bon, créer la réservation
-    new_reservation = Reservation(
-        user_id=user_id,
-        vehicle_id=vehicle.id,
-        start_date=start_date,
-        end_date=end_date,
-        status="EN ATTENTE"
-    )
-    db.session.add(new_reservation)
-    db.session.commit()
+    # Vérification (une requête indexée) puis insertion ; la base refuse tout chevauchement
+    # qui apparaîtrait entre les deux (demandes simultanées), voir app/booking.py
+    try:
+        new_reservation = book_vehicle(user_id, vehicle.id, start_date, end_date)
+    except ReservationConflict as e:
+        if e.status == "EN ATTENTE":
+            return jsonify({"message": "A pending reservation already exists for these dates"}), 400
+        return jsonify({"message": "Vehicle is already booked for the selected dates"}), 400
+    invalidate_vehicle_availability(vehicle.id, start_date, end_date)
 
     return jsonify({
         "message": "Reservation created successfully",
@@ -76,21 +66,166 @@ def create_reservation():
     }), 201
 
 
+MAX_QUOTE_VEHICLES = 50
+
+
+@bp.route("/quote", methods=["POST"])
+def quote_reservations():
+    """
+    Disponibilité et prix de plusieurs véhicules pour les mêmes dates (écrans de comparaison).
+    Corps : {"start_date", "end_date", "vehicle_ids": [...], "insurance_cost": facultatif}.
+    """
+    data = request.get_json(silent=True) or {}
+
+    vehicle_ids = data.get("vehicle_ids")
+    if not data.get("start_date") or not data.get("end_date") or not vehicle_ids:
+        return jsonify({"message": "Vehicle IDs, start date, and end date are required"}), 400
+    if not isinstance(vehicle_ids, list) or not all(isinstance(v, int) and not isinstance(v, bool) for v in vehicle_ids):
+        return jsonify({"message": "vehicle_ids must be a list of integers"}), 400
+    if len(vehicle_ids) > MAX_QUOTE_VEHICLES:
+        return jsonify({"message": f"At most {MAX_QUOTE_VEHICLES} vehicles can be quoted at once"}), 400
+
+    try:
+        start_date = parser.isoparse(data["start_date"]).date()
+        end_date = parser.isoparse(data["end_date"]).date()
+    except (TypeError, ValueError):
+        return jsonify({"message": "Invalid date format. Use ISO 8601 or YYYY-MM-DD"}), 400
+    if start_date >= end_date:
+        return jsonify({"message": "Start date must be before end date"}), 400
+
+    insurance_cost = data.get("insurance_cost") or 0
+    if not isinstance(insurance_cost, (int, float)) or isinstance(insurance_cost, bool) or insurance_cost < 0:
+        return jsonify({"message": "insurance_cost must be a positive number"}), 400
+
+    try:
+        quotes = quote_vehicles(vehicle_ids, start_date, end_date, insurance_cost)
+        ordered = list(dict.fromkeys(vehicle_ids))  # ordre de la demande, sans doublons
+        return jsonify({
+            "start_date": start_date.strftime("%Y-%m-%d"),
+            "end_date": end_date.strftime("%Y-%m-%d"),
+            "quotes": [quotes[vehicle_id] for vehicle_id in ordered if vehicle_id in quotes],
+            "not_found": [vehicle_id for vehicle_id in ordered if vehicle_id not in quotes],
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+class InvalidReservationFilter(ValueError):
+    """Levée lorsqu'un filtre de la liste des réservations est invalide."""
+
+
+def parse_reservation_filters(args):
+    """
+    Lit `status` (un ou plusieurs statuts séparés par des virgules) et la fenêtre `from` / `to`
+    (ISO 8601, bornes facultatives) : les réservations qui la chevauchent sont retenues.
+    """
+    statuses = [status.strip() for status in (args.get("status") or "").split(",") if status.strip()]
+    unknown = [status for status in statuses if status not in RESERVATION_STATUSES]
+    if unknown:
+        raise InvalidReservationFilter(f"Invalid status. Valid statuses are: {list(RESERVATION_STATUSES)}")
+
+    try:
+        window_start = parser.isoparse(args["from"]).date() if args.get("from") else None
+        window_end = parser.isoparse(args["to"]).date() if args.get("to") else None
+    except ValueError:
+        raise InvalidReservationFilter("Invalid date format. Use ISO 8601 or YYYY-MM-DD")
+    if window_start and window_end and window_start > window_end:
+        raise InvalidReservationFilter("from must not be after to")
+
+    return statuses, window_start, window_end
+
+
+def reservation_list(query, order_by, sort_key, serialize, paged):
+    """
+    Contenu de la réponse d'une liste de réservations.
+    - `paged` (curseur demandé) : page {limit, next_cursor, reservations} triée selon `order_by` ;
+    - sinon : liste JSON complète, forme historique attendue par l'application mobile.
+    """
+    if not paged:
+        return [serialize(row) for row in query.order_by(Reservation.id).all()]
+
+    limit = get_page_size()
+    rows, next_cursor = paginate_keyset(query, order_by, sort_key, request.args.get("cursor"), limit)
+    return {"limit": limit, "next_cursor": next_cursor, "reservations": [serialize(row) for row in rows]}
+
+
+# Historique du locataire : périmètre -> (condition sur les dates, ordre de la pagination)
+RESERVATION_SCOPES = {
+    "upcoming": (lambda today: Reservation.start_date > today, "asc"),
+    "current": (lambda today: (Reservation.start_date <= today) & (Reservation.end_date >= today), "asc"),
+    "past": (lambda today: Reservation.end_date < today, "desc"),
+}
+THUMBNAIL_WIDTH = 320  # pixels, déclinaison servie par /vehicles/images/<fichier>?w=
+
+
 @bp.route("/", methods=["GET"])
 @jwt_required()
 def get_reservations():
+    """
+    Réservations du locataire connecté. `scope=upcoming|current|past` restreint aux réservations
+    à venir / en cours / passées et pagine par curseur (`cursor`, `limit`) : à venir et en cours
+    par date croissante, passées (et `cursor` sans scope) par date décroissante. Sans `scope` ni
+    `cursor`, liste complète (forme historique). `status` comme pour /owner.
+    Titre et miniature du véhicule viennent de la même requête.
+    """
     user_id = get_jwt_identity()
 
-    reservations = Reservation.query.filter_by(user_id=user_id).all()
-    return jsonify([
-        {
-            "id": r.id,
-            "vehicle_id": r.vehicle_id,
-            "start_date": r.start_date.strftime("%Y-%m-%d"),
-            "end_date": r.end_date.strftime("%Y-%m-%d"),
-            "status": r.status
-        } for r in reservations
-    ]), 200
+    try:
+        scope = request.args.get("scope")
+        if scope is not None and scope not in RESERVATION_SCOPES:
+            raise InvalidReservationFilter(f"Invalid scope. Valid scopes are: {list(RESERVATION_SCOPES)}")
+        statuses, _, _ = parse_reservation_filters(request.args)
+
+        # Première image du véhicule (même ordre que sa fiche)
+        first_image_id = select(func.min(VehicleImage.id)).where(
+            VehicleImage.vehicle_id == Reservation.vehicle_id
+        ).correlate(Reservation).scalar_subquery()
+
+        query = db.session.query(
+            Reservation.id,
+            Reservation.vehicle_id,
+            Reservation.start_date,
+            Reservation.end_date,
+            Reservation.status,
+            Vehicle.title,
+            VehicleImage.file_name,
+        ).join(Vehicle, Vehicle.id == Reservation.vehicle_id).outerjoin(
+            VehicleImage, VehicleImage.id == first_image_id
+        ).filter(Reservation.user_id == user_id)
+
+        direction = "desc"
+        if scope:
+            condition, direction = RESERVATION_SCOPES[scope]
+            query = query.filter(condition(date.today()))
+        if statuses:
+            query = query.filter(Reservation.status.in_(statuses))
+
+        prefix = vehicle_image_url_prefix()
+
+        def serialize(r):
+            return {
+                "id": r.id,
+                "vehicle_id": r.vehicle_id,
+                "vehicle_title": r.title,
+                "vehicle_thumbnail": f"{prefix}{quote(r.file_name)}?w={THUMBNAIL_WIDTH}" if r.file_name else None,
+                "start_date": r.start_date.strftime("%Y-%m-%d"),
+                "end_date": r.end_date.strftime("%Y-%m-%d"),
+                "status": r.status
+            }
+
+        # Sans `scope` ni `cursor` : liste complète, comme avant (application mobile)
+        paged = scope is not None or request.args.get("cursor") is not None
+        return jsonify(reservation_list(
+            query,
+            [(Reservation.start_date, direction), (Reservation.id, direction)],
+            f"reservations:{scope or 'all'}",
+            serialize,
+            paged,
+        )), 200
+    except (InvalidCursor, InvalidReservationFilter) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @bp.route("/<int:reservation_id>/status", methods=["PATCH"])
@@ -124,7 +259,15 @@ def update_reservation_status(reservation_id):
 
     # Modifier le statut de la réservation
     reservation.status = data["status"]
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        # Une réservation expirée remise en attente / confirmée alors que les dates ont été reprises
+        db.session.rollback()
+        if is_overlap_violation(e):
+            return jsonify({"message": "Vehicle is already booked for the selected dates"}), 400
+        raise
+    invalidate_vehicle_availability(reservation.vehicle_id, reservation.start_date, reservation.end_date)
 
     return jsonify({
         "message": "Reservation status updated successfully",
@@ -138,29 +281,57 @@ def update_reservation_status(reservation_id):
     }), 200
 
 
+# Réservations du propriétaire, de la plus récente (date de début) à la plus ancienne
+OWNER_RESERVATION_ORDER = [(Reservation.start_date, "desc"), (Reservation.id, "desc")]
+
+
 @bp.route("/owner", methods=["GET"])
 @jwt_required()
 def get_reservations_for_owner():
+    """
+    Réservations des véhicules du propriétaire, filtrables par `status` et par fenêtre de dates `from` / `to`.
+    Liste complète par défaut ; paginée par curseur si `cursor` est fourni (vide pour la première page).
+    Une seule requête : jointure réservation / véhicule limitée aux colonnes affichées.
+    """
     user_id = get_jwt_identity()
 
-    # Récupérer les véhicules appartenant au propriétaire
-    vehicles = Vehicle.query.filter_by(owner_id=user_id).all()
-    vehicle_ids = [v.id for v in vehicles]
-
-    # Récupérer les réservations associées à ces véhicules
-    reservations = Reservation.query.filter(Reservation.vehicle_id.in_(vehicle_ids)).all()
-
-    return jsonify([
-        {
-            "id": r.id,
-            "vehicle_id": r.vehicle_id,
-            "vehicle_title": Vehicle.query.get(r.vehicle_id).title,
-            "start_date": r.start_date.strftime("%Y-%m-%d"),
-            "end_date": r.end_date.strftime("%Y-%m-%d"),
-            "status": r.status,
-            "user_id": r.user_id
-        } for r in reservations
-    ]), 200
+    try:
+        statuses, window_start, window_end = parse_reservation_filters(request.args)
+
+        query = db.session.query(
+            Reservation.id,
+            Reservation.vehicle_id,
+            Vehicle.title,
+            Reservation.start_date,
+            Reservation.end_date,
+            Reservation.status,
+            Reservation.user_id,
+        ).join(Vehicle, Vehicle.id == Reservation.vehicle_id).filter(Vehicle.owner_id == user_id)
+
+        if statuses:
+            query = query.filter(Reservation.status.in_(statuses))
+        if window_start:
+            query = query.filter(Reservation.end_date >= window_start)
+        if window_end:
+            query = query.filter(Reservation.start_date <= window_end)
+
+        def serialize(r):
+            return {
+                "id": r.id,
+                "vehicle_id": r.vehicle_id,
+                "vehicle_title": r.title,
+                "start_date": r.start_date.strftime("%Y-%m-%d"),
+                "end_date": r.end_date.strftime("%Y-%m-%d"),
+                "status": r.status,
+                "user_id": r.user_id
+            }
+
+        paged = request.args.get("cursor") is not None
+        return jsonify(reservation_list(query, OWNER_RESERVATION_ORDER, "owner_reservations", serialize, paged)), 200
+    except (InvalidCursor, InvalidReservationFilter) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 # 4. Supprimer une reservation (propriétaire uniquement)
 @bp.route("delete/by_reservation_owner/<int:reservation_id>", methods=["DELETE"])
@@ -174,6 +345,7 @@ def delete_reservation_by_owner(reservation_id):
 
     db.session.delete(reservation)
     db.session.commit()
+    invalidate_vehicle_availability(reservation.vehicle_id, reservation.start_date, reservation.end_date)
     return jsonify({"message": "reservation deleted successfully!"}), 200
 
 
@@ -193,4 +365,5 @@ def delete_reservation_by_vehiccle_owner(reservation_id):
 
     db.session.delete(reservation)
     db.session.commit()
+    invalidate_vehicle_availability(reservation.vehicle_id, reservation.start_date, reservation.end_date)
     return jsonify({"message": "reservation deleted successfully!"}), 200
\ No newline at end of file
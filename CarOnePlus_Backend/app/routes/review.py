@@ -2,10 +2,37 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import Reservation, Review, Vehicle, VehicleImage, User, db
 from datetime import datetime
-from sqlalchemy import desc
+from sqlalchemy import desc, update
+from app.http_cache import add_validators, make_etag, not_modified
+from app.routes.vehicles import invalidate_vehicle_listings, vehicle_snapshot
 
 bp = Blueprint("reviews", __name__, url_prefix="/reviews")
 
+
+def update_vehicle_rating(vehicle_id, rating_delta, count_delta):
+    """
+    Met à jour les agrégats de notes du véhicule en O(1), dans la transaction de l'avis.
+    L'incrément est fait en SQL (rating_sum = rating_sum + delta) : pas de perte sous écritures concurrentes.
+    À appeler pour toute écriture d'avis (deltas nuls pour un commentaire) : `updated_at` avance et sert
+    de Last-Modified aux avis du véhicule, y compris quand l'avis le plus récent est supprimé.
+    """
+    db.session.execute(
+        update(Vehicle)
+        .where(Vehicle.id == vehicle_id)
+        .values(
+            rating_sum=Vehicle.rating_sum + rating_delta,
+            rating_count=Vehicle.rating_count + count_delta,
+            updated_at=db.func.now(),
+        )
+    )
+
+
+def invalidate_vehicle_rating(vehicle_id, before):
+    """La note apparaît dans les listes et sert au tri : invalide les pages en cache concernées (après le commit)."""
+    vehicle = db.session.get(Vehicle, vehicle_id)
+    if vehicle:
+        invalidate_vehicle_listings(before, vehicle_snapshot(vehicle))
+
 @bp.route('/create', methods=['POST'])
 @jwt_required()
 def add_review():
@@ -45,11 +72,11 @@ def add_review():
     db.session.add(review)
     
     # Mettre à jour la note moyenne du véhicule
-    db.session.flush()
-    avg_rating = db.session.query(db.func.avg(Review.rating)).filter_by(vehicle_id=vehicle_id).scalar()
-    vehicle.average_rating = round(float(avg_rating), 2) if avg_rating else None
+    before = vehicle_snapshot(vehicle)
+    update_vehicle_rating(vehicle_id, rating, 1)
     
     db.session.commit()
+    invalidate_vehicle_rating(vehicle_id, before)
     
     return jsonify({
         "message": "Review added successfully",
@@ -59,12 +86,25 @@ def add_review():
 
 @bp.route('/vehicles/<int:vehicle_id>/reviews', methods=['GET'])
 def get_vehicle_reviews(vehicle_id):
-    vehicle = Vehicle.query.get(vehicle_id)
-    if not vehicle:
+    # Version des avis du véhicule et agrégats de notes, en une requête indexée.
+    # Last-Modified : Vehicle.updated_at, avancé à chaque écriture d'avis (update_vehicle_rating) ;
+    # max(Review.updated_at) reculerait à la suppression de l'avis le plus récent
+    version = db.session.query(
+        Vehicle.rating_sum, Vehicle.rating_count, Vehicle.updated_at, db.func.max(Review.updated_at)
+    ).outerjoin(Review, Review.vehicle_id == Vehicle.id).filter(Vehicle.id == vehicle_id).group_by(
+        Vehicle.id, Vehicle.rating_sum, Vehicle.rating_count, Vehicle.updated_at
+    ).first()
+    if not version:
         return jsonify({"error": "Vehicle not found"}), 404
     
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
+
+    rating_sum, review_count, last_modified, last_review_update = version
+    etag = make_etag("reviews", vehicle_id, review_count, rating_sum, last_modified, last_review_update, page, per_page)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
     
     reviews_query = Review.query.filter_by(vehicle_id=vehicle_id).order_by(desc(Review.created_at))
     pagination = reviews_query.paginate(page=page, per_page=per_page, error_out=False)
@@ -82,17 +122,14 @@ def get_vehicle_reviews(vehicle_id):
             "created_at": r.created_at.isoformat()
         })
     
-    # Calculer la moyenne des notes
-    avg_rating = db.session.query(db.func.avg(Review.rating)).filter_by(vehicle_id=vehicle_id).scalar()
-    total_reviews = reviews_query.count()
-    
-    return jsonify({
+    response = jsonify({
         "reviews": results,
-        "total_reviews": total_reviews,
+        "total_reviews": review_count,
         "total_pages": pagination.pages,
         "current_page": page,
-        "average_rating": round(float(avg_rating), 2) if avg_rating else None
-    }), 200
+        "average_rating": round(rating_sum / review_count, 2) if review_count else None
+    })
+    return add_validators(response, etag, last_modified), 200
 
 @bp.route('/users/<int:user_id>/reviews', methods=['GET'])
 @jwt_required()
@@ -150,21 +187,21 @@ def update_review(review_id):
     if rating and not (1 <= rating <= 5):
         return jsonify({"error": "Rating must be between 1 and 5"}), 400
     
-    if rating:
+    rating_changed = bool(rating) and rating != review.rating
+    if rating_changed:
+        before = vehicle_snapshot(db.session.get(Vehicle, review.vehicle_id))
+    # Mettre à jour la note moyenne du véhicule (différence entre nouvelle et ancienne note, 0 si inchangée)
+    update_vehicle_rating(review.vehicle_id, rating - review.rating if rating_changed else 0, 0)
+    if rating_changed:
         review.rating = rating
     if comment:
         review.comment = comment
     
     review.updated_at = datetime.utcnow()
     
-    # Mettre à jour la note moyenne du véhicule
-    db.session.flush()
-    avg_rating = db.session.query(db.func.avg(Review.rating)).filter_by(vehicle_id=review.vehicle_id).scalar()
-    vehicle = Vehicle.query.get(review.vehicle_id)
-    if vehicle:
-        vehicle.average_rating = round(float(avg_rating), 2) if avg_rating else None
-    
     db.session.commit()
+    if rating_changed:
+        invalidate_vehicle_rating(review.vehicle_id, before)
     
     return jsonify({"message": "Review updated successfully"}), 200
 
@@ -182,15 +219,11 @@ def delete_review(review_id):
         return jsonify({"error": "Unauthorized action"}), 403
     
     vehicle_id = review.vehicle_id
+    before = vehicle_snapshot(db.session.get(Vehicle, vehicle_id))
+    update_vehicle_rating(vehicle_id, -review.rating, -1)
     db.session.delete(review)
     
-    # Mettre à jour la note moyenne du véhicule
-    db.session.flush()
-    avg_rating = db.session.query(db.func.avg(Review.rating)).filter_by(vehicle_id=vehicle_id).scalar()
-    vehicle = Vehicle.query.get(vehicle_id)
-    if vehicle:
-        vehicle.average_rating = round(float(avg_rating), 2) if avg_rating else None
-    
     db.session.commit()
+    invalidate_vehicle_rating(vehicle_id, before)
     
     return jsonify({"message": "Review deleted successfully"}), 200
\ No newline at end of file
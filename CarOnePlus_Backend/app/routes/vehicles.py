@@ -1,8 +1,26 @@
 from flask import Blueprint, request, jsonify, url_for, send_from_directory
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Vehicle, VehicleImage, User, db
+from app.models import VEHICLE_RATING_SQL, Reservation, Vehicle, VehicleImage, User, db
+from app.booking import reservation_overlaps, vehicle_calendars
+from app.pagination import InvalidCursor, cursor_sort_key, get_page_size, order_clauses, paginate_keyset, wants_total
+from app.search import apply_text_search, is_broad_search, search_terms
+from app.cache import cache_key
+from app.http_cache import add_validators, make_etag, not_modified
+from app.images import send_image
+from app import cache, geocoder, storage
+from app.storage import FileTooLarge, is_stored_key
+from app.importer import FORMATS as IMPORT_FORMATS, import_vehicles
+from sqlalchemy import cast, exists, func, literal, literal_column, select, union_all
 
 import os
+import json
+import math
+from datetime import date, timedelta
+import click
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from werkzeug.datastructures import MultiDict
+from dateutil import parser
 from werkzeug.utils import secure_filename
 from flask import current_app
 import logging
@@ -15,83 +33,466 @@ bp = Blueprint("vehicles", __name__, url_prefix="/vehicles")
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Tri stable utilisé pour la pagination (offset et curseur) : les plus récents d'abord.
+# L'id croît avec created_at et reste unique, il suffit donc comme clé de tri (index primaire).
+VEHICLE_ORDER = [(Vehicle.id, "desc")]
+
+
 def get_upload_folder():
     path = os.path.join(current_app.root_path, "static", "uploads", "vehicles")
     return path
 
 
+def vehicle_image_url_prefix():
+    """URL absolue du dossier d'images, calculée une seule fois par requête au lieu d'un url_for par image."""
+    placeholder = url_for("vehicles.get_vehicle_image", filename="_", _external=True)
+    return placeholder[:-1]
+
+
+def load_vehicle_images(vehicle_ids):
+    """Charge en une seule requête les noms de fichiers des images de plusieurs véhicules."""
+    images = {vehicle_id: [] for vehicle_id in vehicle_ids}
+    if not vehicle_ids:
+        return images
+
+    rows = db.session.query(VehicleImage.vehicle_id, VehicleImage.file_name).filter(
+        VehicleImage.vehicle_id.in_(vehicle_ids)
+    ).order_by(VehicleImage.vehicle_id, VehicleImage.id).all()
+
+    for vehicle_id, file_name in rows:
+        images[vehicle_id].append(file_name)
+    return images
+
+
+def serialize_vehicles(vehicles):
+    """
+    Transforme une liste de Vehicle en dictionnaires JSON.
+    Les images de toute la page sont chargées en une requête groupée (pas de N+1).
+    """
+    images = load_vehicle_images([vehicle.id for vehicle in vehicles])
+    prefix = vehicle_image_url_prefix()
+
+    return [
+        {
+            "id": vehicle.id,
+            "owner_id": vehicle.owner_id,
+            "title": vehicle.title,
+            "description": vehicle.description,
+            "price_per_day": vehicle.price_per_day,
+            "localisation": vehicle.localisation,
+            "puissance": vehicle.puissance,
+            "type_de_carburant": vehicle.type_de_carburant,
+            "type_de_vehicule": vehicle.type_de_vehicule,
+            "vitesse": vehicle.vitesse,
+            "transmission": vehicle.transmission,
+            "nbreSieges": vehicle.nbreSieges,
+            "lat": vehicle.lat,
+            "lng": vehicle.lng,
+            "available": vehicle.available,
+            "created_at": vehicle.created_at,
+            "average_rating": vehicle.average_rating,
+            "rating_count": vehicle.rating_count,
+            "images": [prefix + quote(file_name) for file_name in images[vehicle.id]],
+        }
+        for vehicle in vehicles
+    ]
+
+
 def serialize_vehicle(vehicle):
     """Transforme un objet Vehicle en dictionnaire JSON."""
+    return serialize_vehicles([vehicle])[0]
+
+
+def vehicle_listing_page(query, order_by=VEHICLE_ORDER, sort_key="recent"):
+    """
+    Pagine une requête de véhicules selon `order_by` (liste de (expression, "asc" | "desc"))
+    et retourne le contenu de la réponse.
+    - `cursor` présent (vide pour la première page) : pagination par curseur, sans COUNT par défaut.
+    - sinon : pagination historique par `offset`, avec le total sauf si `with_total=false`.
+    """
+    limit = get_page_size()
+    cursor = request.args.get("cursor")
+
+    # Les valeurs de tri sont sélectionnées avec chaque véhicule pour construire le curseur suivant
+    keyed = query.add_columns(*[expr.label(f"sort_{i}") for i, (expr, _) in enumerate(order_by)])
+
+    if cursor is not None:
+        rows, next_cursor = paginate_keyset(
+            keyed, order_by, sort_key, cursor, limit, row_values=lambda row: list(row[1:])
+        )
+        response = {
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "vehicles": serialize_vehicles([row[0] for row in rows]),
+        }
+        if wants_total():
+            response["total"] = query.count()
+        return response
+
+    offset = max(request.args.get("offset", default=0, type=int), 0)
+    response = {"limit": limit, "offset": offset}
+    if wants_total(default=True):
+        response["total"] = query.count()
+
+    rows = keyed.order_by(*order_clauses(order_by)).offset(offset).limit(limit).all()
+    response["vehicles"] = serialize_vehicles([row[0] for row in rows])
+    return response
+
+
+# --- Cache des listes publiques ---------------------------------------------
+# Chaque page en cache est étiquetée avec :
+# - "vehicle:<id>" pour chaque véhicule qu'elle contient (changement de contenu : images, texte...) ;
+# - "filters:<filtres>" pour son jeu de filtres, afin d'invalider uniquement les listes
+#   dont l'appartenance ou l'ordre peut changer quand un véhicule est créé, modifié ou supprimé.
+
+FILTERS_TAG = "filters:"
+
+# Champs d'un véhicule qui influencent les filtres, le tri ou les facettes
+VEHICLE_LISTING_FIELDS = (
+    "id", "title", "description", "localisation", "price_per_day", "type_de_vehicule",
+    "type_de_carburant", "transmission", "nbreSieges", "available",
+    "rating_sum", "rating_count", "lat", "lng",
+)
+
+# Champs qui n'influencent que l'ordre (ou la présence) des véhicules pour un tri donné
+SORT_FIELDS = {
+    "rating": {"rating_sum", "rating_count"},
+    "distance": {"lat", "lng"},
+}
+RANKING_FIELDS = set().union(*SORT_FIELDS.values())
+
+
+def vehicle_tag(vehicle_id):
+    return f"vehicle:{vehicle_id}"
+
+
+def calendar_tag(vehicle_id):
+    return f"calendar:{vehicle_id}"
+
+
+def filters_tag(filters):
+    return FILTERS_TAG + json.dumps(filters, sort_keys=True, separators=(",", ":"))
+
+
+def vehicle_snapshot(vehicle):
+    """Copie des champs de listing d'un véhicule, à prendre avant et après une écriture."""
+    return {name: getattr(vehicle, name) for name in VEHICLE_LISTING_FIELDS}
+
+
+def vehicle_matches_filters(snapshot, filters):
+    """Le véhicule peut-il apparaître dans une liste avec ces filtres ? (au sens large pour `q`)"""
+    if bool(snapshot["available"]) != filters["available"]:
+        return False
+    if filters["localisation"] and filters["localisation"] not in (snapshot["localisation"] or "").lower():
+        return False
+    if filters["min_price"] is not None and snapshot["price_per_day"] < filters["min_price"]:
+        return False
+    if filters["max_price"] is not None and snapshot["price_per_day"] > filters["max_price"]:
+        return False
+    if filters["type_de_vehicule"] and snapshot["type_de_vehicule"] != filters["type_de_vehicule"]:
+        return False
+    if filters["q"]:
+        text = " ".join(snapshot[name] or "" for name in ("title", "description", "localisation")).lower()
+        if not all(term in text for term in filters["q"].split()):
+            return False
+    if filters.get("sort") == "distance" and (snapshot["lat"] is None or snapshot["lng"] is None):
+        return False
+    return True
+
+
+def invalidate_vehicle_listings(before=None, after=None):
+    """
+    Invalide les listes en cache touchées par l'écriture d'un véhicule.
+    `before` / `after` : instantanés (vehicle_snapshot) avant et après, None pour une création / suppression.
+    """
+    snapshots = [snapshot for snapshot in (before, after) if snapshot is not None]
+    tags = {vehicle_tag(snapshot["id"]) for snapshot in snapshots}
+
+    changed = None
+    if before is not None and after is not None:
+        changed = {name for name in VEHICLE_LISTING_FIELDS if before.get(name) != after.get(name)}
+
+    if before != after:
+        for tag in cache.tags(FILTERS_TAG):
+            filters = json.loads(tag[len(FILTERS_TAG):])
+            # Une note ou une position modifiée ne déplace le véhicule que dans les listes triées dessus
+            if changed is not None and changed <= RANKING_FIELDS and not changed & SORT_FIELDS.get(filters.get("sort"), set()):
+                continue
+            if any(vehicle_matches_filters(snapshot, filters) for snapshot in snapshots):
+                tags.add(tag)
+
+    cache.invalidate_tags(tags)
+
+
+def invalidate_vehicle_availability(vehicle_id, start_date, end_date):
+    """
+    Invalide le calendrier du véhicule et les listes filtrées sur des dates qui chevauchent
+    une réservation créée, supprimée ou dont le statut a changé.
+    """
+    tags = [calendar_tag(vehicle_id)]
+    for tag in cache.tags(FILTERS_TAG):
+        filters = json.loads(tag[len(FILTERS_TAG):])
+        if not filters.get("start_date"):
+            continue
+        if filters["start_date"] <= end_date.isoformat() and filters["end_date"] >= start_date.isoformat():
+            tags.append(tag)
+    cache.invalidate_tags(tags)
+
+
+def cached_vehicle_listing(filters, build_page):
+    """Sert une page de véhicules depuis le cache, ou la calcule avec `build_page()` et la met en cache."""
+    page = {
+        "limit": get_page_size(),
+        "offset": request.args.get("offset", default=0, type=int),
+        "cursor": request.args.get("cursor"),
+        "with_total": request.args.get("with_total"),
+    }
+    key = cache_key("vehicles", {"endpoint": request.endpoint, "filters": filters, "page": page})
+
+    body = cache.get(key)
+    if body is None:
+        payload = build_page()
+        body = current_app.json.dumps(payload)
+        tags = [filters_tag(filters)] + [vehicle_tag(vehicle["id"]) for vehicle in payload["vehicles"]]
+        cache.set(key, body, tags=tags)
+
+    return current_app.response_class(body, mimetype="application/json"), 200
+
+
+class InvalidFilter(ValueError):
+    """Levée lorsqu'un filtre ou un tri est invalide ou incomplet."""
+
+
+def parse_date_range(args):
+    """Lit `start_date` / `end_date` (ISO 8601), à fournir ensemble ; retourne deux dates ISO ou (None, None)."""
+    start, end = args.get("start_date"), args.get("end_date")
+    if not start and not end:
+        return None, None
+    if not start or not end:
+        raise InvalidFilter("start_date and end_date must be provided together")
+    try:
+        start_date = parser.isoparse(start).date()
+        end_date = parser.isoparse(end).date()
+    except ValueError:
+        raise InvalidFilter("Invalid date format. Use ISO 8601 or YYYY-MM-DD")
+    if start_date > end_date:
+        raise InvalidFilter("start_date must not be after end_date")
+    return start_date.isoformat(), end_date.isoformat()
+
+
+def parse_vehicle_filters(args):
+    """Lit et normalise les filtres du catalogue (sert aussi de clé de cache)."""
+    available = args.get("available", default="true")
+    start_date, end_date = parse_date_range(args)
     return {
-        "id": vehicle.id,
-        "owner_id": vehicle.owner_id,
-        "title": vehicle.title,
-        "description": vehicle.description,
-        "price_per_day": vehicle.price_per_day,
-        "localisation": vehicle.localisation,
-        "puissance": vehicle.puissance,
-        "type_de_carburant": vehicle.type_de_carburant,
-        "type_de_vehicule": vehicle.type_de_vehicule,
-        "vitesse": vehicle.vitesse,
-        "transmission": vehicle.transmission,
-        "nbreSieges": vehicle.nbreSieges,
-        "lat": vehicle.lat,
-        "lng": vehicle.lng,
-        "available": vehicle.available,
-        "created_at": vehicle.created_at,
-        "images": [
-            url_for("vehicles.get_vehicle_image", filename=image.file_name, _external=True)
-            for image in vehicle.images
-        ],
+        "localisation": (args.get("localisation") or "").strip().lower() or None,
+        "min_price": args.get("min_price", type=float),
+        "max_price": args.get("max_price", type=float),
+        "type_de_vehicule": args.get("type_de_vehicule") or None,
+        # Par défaut, ne montrer que les véhicules disponibles
+        "available": available.lower() in ["true", "1", "yes"],
+        "q": " ".join(search_terms(args.get("q") or "")) or None,
+        # Véhicules libres sur toute la période (aucune réservation bloquante qui chevauche)
+        "start_date": start_date,
+        "end_date": end_date,
     }
 
 
+def bookable_between(start_date, end_date):
+    """Véhicules mis en ligne et libres sur la période (mêmes règles que /list avec des dates)."""
+    return filter_available_between(Vehicle.query.filter(Vehicle.available.is_(True)), start_date, end_date)
+
+
+def filter_available_between(query, start_date, end_date):
+    """
+    Exclut les véhicules réservés sur la période par un anti-join (NOT EXISTS corrélé),
+    servi par l'index ix_reservation_vehicle_dates_status.
+    """
+    booked = exists().where(Reservation.vehicle_id == Vehicle.id, *reservation_overlaps(start_date, end_date))
+    return query.filter(~booked)
+
+
+SORTS = ("newest", "price_asc", "price_desc", "rating", "distance")
+
+
+def parse_vehicle_sort(args):
+    """
+    Lit le tri demandé (`sort=`) ; le tri par distance exige `lat` et `lng`.
+    Les coordonnées sont arrondies (~10 m) pour que des positions voisines partagent le cache.
+    """
+    sort = args.get("sort") or None
+    if sort is not None and sort not in SORTS:
+        raise InvalidFilter(f"Invalid sort. Valid sorts are: {list(SORTS)}")
+
+    near = None
+    if sort == "distance":
+        lat = args.get("lat", type=float)
+        lng = args.get("lng", type=float)
+        if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise InvalidFilter("Sorting by distance requires valid lat and lng parameters")
+        near = [round(lat, 4), round(lng, 4)]
+
+    return {"sort": sort, "near": near}
+
+
+def vehicle_rating_expr():
+    """Note moyenne (0 sans avis), écrite comme l'index ix_vehicle_available_rating pour qu'il serve au tri."""
+    return literal_column(VEHICLE_RATING_SQL, type_=db.Float)
+
+
+def vehicle_distance_expr(lat, lng):
+    """
+    Carré de la distance équirectangulaire depuis (lat, lng) : croissant avec la distance réelle
+    à l'échelle d'une ville, et calculable sans fonctions trigonométriques en SQL.
+    """
+    scale = math.cos(math.radians(lat))
+    dlat = Vehicle.lat - lat
+    dlng = (Vehicle.lng - lng) * scale
+    return dlat * dlat + dlng * dlng
+
+
+def sort_vehicles(query, filters):
+    """Retourne (query, order_by, sort_key) pour le tri demandé ; l'id départage les égalités."""
+    sort = filters.get("sort")
+    if sort == "price_asc":
+        return query, [(Vehicle.price_per_day, "asc"), (Vehicle.id, "asc")], sort
+    if sort == "price_desc":
+        return query, [(Vehicle.price_per_day, "desc"), (Vehicle.id, "desc")], sort
+    if sort == "rating":
+        return query, [(vehicle_rating_expr(), "desc"), (Vehicle.id, "desc")], sort
+    if sort == "distance":
+        lat, lng = filters["near"]
+        query = query.filter(Vehicle.lat.isnot(None), Vehicle.lng.isnot(None))
+        # Le curseur n'est valable que pour le même point de départ
+        return query, [(vehicle_distance_expr(lat, lng), "asc"), (Vehicle.id, "asc")], f"distance:{lat}:{lng}"
+    return query, VEHICLE_ORDER, "recent"
+
+
+def search_sort_key(q, cursor=None):
+    """
+    Tri d'une recherche `q` sans `sort` : "relevance", ou "recent" si elle est trop large
+    (voir is_broad_search). Les pages suivantes gardent le tri de leur curseur.
+    """
+    previous = cursor_sort_key(cursor) if cursor else None
+    if previous in ("relevance", "recent"):
+        return previous
+    return "recent" if is_broad_search(q) else "relevance"
+
+
+def filter_vehicles(filters, cursor=None):
+    """
+    Construit la requête de véhicules correspondant aux filtres normalisés.
+    Retourne (query, order_by, sort_key) : tri demandé (`sort`), sinon par pertinence si `q`
+    est fourni (par récence si la recherche est trop large), sinon par récence.
+    `cursor` (pagination) fixe le tri d'une recherche d'une page à l'autre.
+    """
+    query = Vehicle.query
+
+    # Filtre par localisation
+    if filters["localisation"]:
+        query = query.filter(Vehicle.localisation.ilike(f"%{filters['localisation']}%"))
+
+    # Filtre par prix minimum et maximum
+    if filters["min_price"] is not None:
+        query = query.filter(Vehicle.price_per_day >= filters["min_price"])
+    if filters["max_price"] is not None:
+        query = query.filter(Vehicle.price_per_day <= filters["max_price"])
+
+    # Filtre par type de véhicule
+    if filters["type_de_vehicule"]:
+        query = query.filter(Vehicle.type_de_vehicule == filters["type_de_vehicule"])
+
+    # Filtre par disponibilité : véhicule mis en ligne (ou retiré) par son propriétaire
+    query = query.filter(Vehicle.available == filters["available"])
+
+    # Filtre par dates de location : seules les réservations qui chevauchent la période comptent
+    if filters.get("start_date"):
+        query = filter_available_between(
+            query, date.fromisoformat(filters["start_date"]), date.fromisoformat(filters["end_date"])
+        )
+
+    # Recherche plein texte indexée (title, description, localisation), triée par pertinence,
+    # ou par récence dans l'ordre de l'index (recherche trop large, ou sort=newest)
+    if filters["q"]:
+        sort = filters.get("sort")
+        if sort is None:
+            order = search_sort_key(filters["q"], cursor)
+        else:
+            order = "recent" if sort == "newest" else None
+        searched = apply_text_search(query, filters["q"], order=order)
+        if searched:
+            query, order_by = searched
+            if order_by:
+                return query, order_by, order
+
+    return sort_vehicles(query, filters)
+
 
 @bp.route("/list", methods=["GET"])
 def list_vehicles():
-    """Liste paginée des véhicules avec filtres par localisation, prix et disponibilité."""
+    """
+    Liste paginée des véhicules avec recherche plein texte, filtres par localisation, prix, disponibilité
+    et dates de location (`start_date` / `end_date`), et tri (`sort=newest|price_asc|price_desc|rating|distance`, avec `lat` / `lng` pour la distance).
+    """
     try:
-        query = Vehicle.query
-
-        # Filtre par localisation
-        localisation = request.args.get("localisation")
-        if localisation:
-            query = query.filter(Vehicle.localisation.ilike(f"%{localisation}%"))
-
-        # Filtre par prix minimum et maximum
-        min_price = request.args.get("min_price", type=float)
-        max_price = request.args.get("max_price", type=float)
-        if min_price is not None:
-            query = query.filter(Vehicle.price_per_day >= min_price)
-        if max_price is not None:
-            query = query.filter(Vehicle.price_per_day <= max_price)
-        
-        # Filtre par type de véhicule
-        vehicle_type = request.args.get("type_de_vehicule")
-        if vehicle_type:
-            query = query.filter(Vehicle.type_de_vehicule == vehicle_type)
-
-        #Filtre par disponibilité - par défaut, ne montrer que les véhicules disponibles
-        available = request.args.get("available", default="true")
-        is_available = available.lower() in ["true", "1", "yes"]
-        query = query.filter(Vehicle.available == is_available)
-
-        # Pagination
-        limit = request.args.get("limit", default=10, type=int)
-        offset = request.args.get("offset", default=0, type=int)
-
-        # Nombre total de véhicules après filtrage
-        total_count = query.count()
-
-        # Appliquer la pagination
-        vehicles = query.offset(offset).limit(limit).all()
+        filters = {**parse_vehicle_filters(request.args), **parse_vehicle_sort(request.args)}
 
-        return jsonify({
-            "total": total_count,
-            "limit": limit,
-            "offset": offset,
-            "vehicles": [serialize_vehicle(vehicle) for vehicle in vehicles],
-        }), 200
+        def build_page():
+            query, order_by, sort_key = filter_vehicles(filters, cursor=request.args.get("cursor"))
+            return vehicle_listing_page(query, order_by=order_by, sort_key=sort_key)
+
+        return cached_vehicle_listing(filters, build_page)
+    except (InvalidCursor, InvalidFilter) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+FACET_COLUMNS = ["type_de_vehicule", "type_de_carburant", "transmission", "nbreSieges"]
+
+FACETS_CACHE_TTL = 60  # secondes
+
+
+def compute_vehicle_facets(query):
+    """Compte les véhicules par valeur de chaque facette en une seule requête (GROUP BY ... UNION ALL)."""
+    filtered = query.with_entities(*[getattr(Vehicle, name) for name in FACET_COLUMNS]).cte("filtered")
+
+    statement = union_all(*[
+        select(
+            literal(name).label("facet"),
+            cast(filtered.c[name], db.String).label("value"),
+            func.count().label("count"),
+        ).group_by(filtered.c[name])
+        for name in FACET_COLUMNS
+    ])
+
+    facets = {name: [] for name in FACET_COLUMNS}
+    for facet, value, count in db.session.execute(statement):
+        if facet == "nbreSieges" and value is not None:
+            value = int(value)
+        facets[facet].append({"value": value, "count": count})
+
+    for values in facets.values():
+        values.sort(key=lambda item: -item["count"])
+    return facets
+
+
+@bp.route("/facets", methods=["GET"])
+def vehicle_facets():
+    """Nombre de véhicules par type, carburant, transmission et nombre de sièges pour les filtres courants."""
+    try:
+        filters = parse_vehicle_filters(request.args)
+        key = cache_key("facets", filters)
+
+        body = cache.get(key)
+        if body is None:
+            query, _, _ = filter_vehicles(filters)
+            body = current_app.json.dumps({"facets": compute_vehicle_facets(query)})
+            cache.set(key, body, ttl=FACETS_CACHE_TTL, tags=[filters_tag(filters)])
+
+        return current_app.response_class(body, mimetype="application/json"), 200
+    except InvalidFilter as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -125,6 +526,9 @@ def create_vehicle():
     )
     db.session.add(vehicle)
     db.session.commit()
+    invalidate_vehicle_listings(after=vehicle_snapshot(vehicle))
+    # Coordonnées calculées en arrière-plan à partir de l'adresse
+    geocoder.enqueue([vehicle.id])
 
     return jsonify({"message": "Vehicle created successfully!", "id": vehicle.id}), 201
 
@@ -139,6 +543,8 @@ def update_vehicle(vehicle_id):
     if not vehicle:
         return jsonify({"message": "Vehicle not found or unauthorized"}), 404
 
+    before = vehicle_snapshot(vehicle)
+
     # Mise à jour des champs
     vehicle.title = data.get("title", vehicle.title)
     vehicle.description = data.get("description", vehicle.description)
@@ -152,7 +558,16 @@ def update_vehicle(vehicle_id):
     vehicle.nbreSieges = data.get("nbreSieges", vehicle.nbreSieges)
     vehicle.available = data.get("available", vehicle.available)
 
+    # Nouvelle adresse : les anciennes coordonnées ne sont plus valables, elles seront recalculées
+    address_changed = vehicle.localisation != before["localisation"]
+    if address_changed:
+        vehicle.lat = vehicle.lng = None
+
+    after = vehicle_snapshot(vehicle)
     db.session.commit()
+    invalidate_vehicle_listings(before, after)
+    if address_changed:
+        geocoder.enqueue([vehicle.id])
     return jsonify({"message": "Vehicle updated successfully!"}), 200
 
 # 4. Supprimer un véhicule (propriétaire uniquement)
@@ -165,11 +580,92 @@ def delete_vehicle(vehicle_id):
     if not vehicle:
         return jsonify({"message": "Vehicle not found or unauthorized"}), 404
 
+    before = vehicle_snapshot(vehicle)
     db.session.delete(vehicle)
     db.session.commit()
+    invalidate_vehicle_listings(before=before)
+    cache.invalidate_tags([calendar_tag(vehicle_id)])
     return jsonify({"message": "Vehicle deleted successfully!"}), 200
 
 
+IMPORT_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/ndjson": "ndjson"}
+
+
+def import_format(file_name=None):
+    """Format d'import : paramètre ?format=, sinon extension du fichier, sinon Content-Type."""
+    fmt = request.args.get("format")
+    if fmt is None and file_name and "." in file_name:
+        fmt = file_name.rsplit(".", 1)[1].lower()
+    if fmt is None:
+        fmt = IMPORT_CONTENT_TYPES.get(request.mimetype)
+    return fmt
+
+
+# Import en masse (propriétaires professionnels) : fichier CSV ou NDJSON envoyé en multipart
+# ("file") ou directement dans le corps de la requête. Le fichier est lu en flux, jamais en entier.
+@bp.route("/import", methods=["POST"])
+@jwt_required()
+def import_vehicles_route():
+    user_id = get_jwt_identity()
+
+    if "file" in request.files:
+        file = request.files["file"]
+        fmt = import_format(file.filename)
+        stream = file.stream
+    else:
+        fmt = import_format()
+        stream = request.stream
+
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"error": f"Invalid format. Valid formats are: {list(IMPORT_FORMATS)}"}), 400
+
+    batch_size = request.args.get("batch_size", current_app.config["IMPORT_BATCH_SIZE"], type=int)
+    if batch_size <= 0:
+        return jsonify({"error": "batch_size must be a positive integer"}), 400
+    dry_run = request.args.get("dry_run", "false").lower() in ("1", "true", "yes")
+
+    try:
+        report = import_vehicles(stream, fmt, user_id, batch_size=batch_size, dry_run=dry_run)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify(report), 200 if dry_run else 201
+
+
+@bp.cli.command("import")
+@click.argument("file", type=click.File("rb"))
+@click.option("--owner-id", type=int, required=True, help="Propriétaire des véhicules importés.")
+@click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), help="Déduit de l'extension si absent.")
+@click.option("--batch-size", type=int, help="Lignes par lot (IMPORT_BATCH_SIZE par défaut).")
+@click.option("--dry-run", is_flag=True, help="Valide le fichier sans rien insérer.")
+def import_vehicles_command(file, owner_id, fmt, batch_size, dry_run):
+    """Importe des véhicules depuis un fichier CSV ou NDJSON."""
+    if fmt is None:
+        fmt = file.name.rsplit(".", 1)[-1].lower()
+        if fmt not in IMPORT_FORMATS:
+            raise click.UsageError("Cannot infer the format from the file name, use --format")
+    if db.session.get(User, owner_id) is None:
+        raise click.UsageError(f"User {owner_id} not found")
+
+    def progress(report):
+        click.echo(f"{report['processed']} rows read, {report['valid']} valid, {report['rejected']} rejected", err=True)
+
+    report = import_vehicles(
+        file, fmt, owner_id,
+        batch_size=batch_size or current_app.config["IMPORT_BATCH_SIZE"],
+        dry_run=dry_run,
+        on_batch=progress,
+    )
+    for error in report["errors"]:
+        click.echo(f"line {error['line']}: {'; '.join(error['errors'])}")
+    action = "validated" if dry_run else "imported"
+    click.echo(f"{report['valid']} vehicle(s) {action}, {report['rejected']} row(s) rejected")
+    if report["inserted"]:
+        # Les workers de géocodage s'arrêtent avec la commande : le backfill termine le travail
+        click.echo("Run `flask geocode backfill` to locate the imported vehicles without coordinates")
+
+
 @bp.route("/my_vehicles", methods=["GET"])
 @jwt_required()
 def my_vehicles():
@@ -183,7 +679,7 @@ def my_vehicles():
         vehicles = Vehicle.query.filter_by(owner_id=user_id).all()
 
         return jsonify({
-            "vehicles": [serialize_vehicle(vehicle) for vehicle in vehicles],
+            "vehicles": serialize_vehicles(vehicles),
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -194,22 +690,129 @@ def my_vehicles():
 # afficher d'un vehicule par son ID
 @bp.route("/<int:vehicle_id>", methods=["GET"])
 def list_images(vehicle_id):
+    # Validation conditionnelle avant de charger et sérialiser le véhicule ;
+    # un véhicule inexistant répond 404 même avec If-None-Match: *
+    version = db.session.query(Vehicle.updated_at).filter(Vehicle.id == vehicle_id).first()
+    if not version:
+        return jsonify({"message": "Vehicle not found"}), 404
+
+    updated_at = version.updated_at
+    etag = make_etag("vehicle", vehicle_id, updated_at)
+    response = not_modified(etag, updated_at)
+    if response is not None:
+        return response
+
     vehicle = Vehicle.query.get(vehicle_id)
     if not vehicle:
         return jsonify({"message": "Vehicle not found"}), 404
 
-    return jsonify(
+    response = jsonify(
         {
           "vehicle": serialize_vehicle(vehicle)
         } 
-    ), 200
+    )
+    return add_validators(response, etag, vehicle.updated_at), 200
+
+
+CALENDAR_DEFAULT_DAYS = 90
+CALENDAR_MAX_DAYS = 366
+CALENDAR_CACHE_TTL = 300  # secondes ; invalidé à chaque écriture de réservation
+
+
+def parse_calendar_window(args):
+    """Lit `from` / `to` (ISO 8601) ; par défaut, les CALENDAR_DEFAULT_DAYS jours à partir d'aujourd'hui."""
+    try:
+        start_date = parser.isoparse(args["from"]).date() if args.get("from") else date.today()
+        end_date = parser.isoparse(args["to"]).date() if args.get("to") else start_date + timedelta(days=CALENDAR_DEFAULT_DAYS - 1)
+    except ValueError:
+        raise InvalidFilter("Invalid date format. Use ISO 8601 or YYYY-MM-DD")
+    if start_date > end_date:
+        raise InvalidFilter("from must not be after to")
+    if (end_date - start_date).days >= CALENDAR_MAX_DAYS:
+        raise InvalidFilter(f"The calendar window is limited to {CALENDAR_MAX_DAYS} days")
+    return start_date, end_date
+
+
+def cached_vehicle_calendars(vehicle_ids, start_date, end_date):
+    """
+    Calendriers des véhicules depuis le cache ; ceux qui manquent sont calculés ensemble
+    (une requête, voir vehicle_calendars) puis mis en cache, chacun sous le tag de son véhicule.
+    """
+    keys = {
+        vehicle_id: cache_key("calendar", {"vehicle": vehicle_id, "from": start_date.isoformat(), "to": end_date.isoformat()})
+        for vehicle_id in vehicle_ids
+    }
+    calendars = {}
+    for vehicle_id, key in keys.items():
+        days = cache.get(key)
+        if days is not None:
+            calendars[vehicle_id] = days
+
+    missing = [vehicle_id for vehicle_id in vehicle_ids if vehicle_id not in calendars]
+    for vehicle_id, days in vehicle_calendars(missing, start_date, end_date).items():
+        cache.set(keys[vehicle_id], days, ttl=CALENDAR_CACHE_TTL, tags=[calendar_tag(vehicle_id)])
+        calendars[vehicle_id] = days
+    return calendars
+
+
+@bp.route("/<int:vehicle_id>/calendar", methods=["GET"])
+def vehicle_calendar(vehicle_id):
+    """
+    Jours réservés du véhicule entre `from` et `to` : `days` contient un caractère par jour,
+    "1" si une réservation en attente ou confirmée le bloque, "0" s'il est libre.
+    """
+    try:
+        start_date, end_date = parse_calendar_window(request.args)
+        calendars = cached_vehicle_calendars([vehicle_id], start_date, end_date)
+        if vehicle_id not in calendars:
+            return jsonify({"message": "Vehicle not found"}), 404
+
+        return jsonify({
+            "vehicle_id": vehicle_id,
+            "from": start_date.isoformat(),
+            "to": end_date.isoformat(),
+            "days": calendars[vehicle_id],
+        }), 200
+    except InvalidFilter as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/fleet/calendar", methods=["GET"])
+@jwt_required()
+def fleet_calendar():
+    """Calendriers (même format que /<id>/calendar) de tous les véhicules du propriétaire connecté."""
+    try:
+        user_id = get_jwt_identity()
+        start_date, end_date = parse_calendar_window(request.args)
+
+        vehicles = db.session.query(Vehicle.id, Vehicle.title).filter(Vehicle.owner_id == user_id).order_by(Vehicle.id).all()
+        calendars = cached_vehicle_calendars([vehicle_id for vehicle_id, _ in vehicles], start_date, end_date)
+
+        return jsonify({
+            "from": start_date.isoformat(),
+            "to": end_date.isoformat(),
+            "vehicles": [
+                {"id": vehicle_id, "title": title, "days": calendars[vehicle_id]}
+                for vehicle_id, title in vehicles if vehicle_id in calendars
+            ],
+        }), 200
+    except InvalidFilter as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @bp.route('/images/<filename>')
 def get_vehicle_image(filename):
+    """Retourne une image de véhicule à partir de son nom de fichier (?w=, ?h=, ?fmt=webp pour une déclinaison)."""
+    if is_stored_key(filename):
+        return send_image(os.path.dirname(storage.path(filename)), filename)
+
+    # Images envoyées avant le stockage par contenu
     UPLOAD_FOLDER = get_upload_folder()
-    """Retourne une image de véhicule à partir de son nom de fichier."""
-    return send_from_directory(os.path.join(os.getcwd(), UPLOAD_FOLDER), filename)
+    return send_image(os.path.join(os.getcwd(), UPLOAD_FOLDER), filename)
 
 
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 5 Mo
@@ -251,34 +854,37 @@ def upload_vehicle_image():
     if file and allowed_file(file.filename):
         logger.debug("File is allowed")  # Débogage
 
-        file.seek(0, os.SEEK_END)  # Aller à la fin du fichier pour mesurer la taille
-        file_size = file.tell()  # Obtenir la taille sans lire le fichier
-        file.seek(0)  # Remettre le curseur au début après vérification
-        logger.debug(f"File size: {file_size} bytes")  # Débogage
-
-        if file_size > MAX_FILE_SIZE:
+        # Copie par blocs en calculant l'empreinte : le fichier n'est jamais lu entièrement en mémoire
+        try:
+            staged = storage.stage(file.stream, file.filename.rsplit(".", 1)[1], max_size=MAX_FILE_SIZE)
+        except FileTooLarge:
             logger.warning("File is too large")  # Débogage
             return jsonify({"message": "File is too large (max 16MB)"}), 400
 
-        filename = secure_filename(file.filename)
-        logger.debug(f"Secure filename: {filename}")  # Débogage
-
-        UPLOAD_FOLDER = get_upload_folder()
-        logger.debug(f"Upload folder: {UPLOAD_FOLDER}")  # Débogage
-
-        if not os.path.exists(UPLOAD_FOLDER):
-            logger.info("Creating upload folder")  # Débogage
-            os.makedirs(UPLOAD_FOLDER)
-
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        logger.debug(f"Saving file to: {file_path}")  # Débogage
-        file.save(file_path)
-
-        # Enregistrer l'image dans la base de données
-        vehicle_image = VehicleImage(vehicle_id=vehicle.id, file_name=filename, file_path=file_path)
-        db.session.add(vehicle_image)
-        db.session.commit()
-        logger.info("Image saved to database")  # Débogage
+        filename = staged.key
+        logger.debug(f"Content key: {filename} ({staged.size} bytes)")  # Débogage
+
+        if VehicleImage.query.filter_by(vehicle_id=vehicle.id, file_name=filename).first():
+            # Même photo déjà associée à ce véhicule
+            storage.discard(staged)
+        else:
+            try:
+                file_path = storage.save_staged(staged)
+                logger.debug(f"Saved file to: {file_path}")  # Débogage
+
+                # Enregistrer l'image dans la base de données
+                vehicle_image = VehicleImage(vehicle_id=vehicle.id, file_name=filename, file_path=file_path)
+                db.session.add(vehicle_image)
+                vehicle.updated_at = db.func.now()  # nouvelle version du véhicule (ETag)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                storage.discard(staged)
+                raise
+            logger.info("Image saved to database")  # Débogage
+
+            # Seules les pages contenant ce véhicule changent
+            cache.invalidate_tags([vehicle_tag(vehicle_id)])
 
         image_url = url_for("vehicles.get_vehicle_image", filename=filename, _external=True)
         logger.debug(f"Image URL: {image_url}")  # Débogage
@@ -288,28 +894,115 @@ def upload_vehicle_image():
     return jsonify({"message": "Invalid file type"}), 400
 
 
+MAX_BATCH_FILES = 20
+UPLOAD_WORKERS = 4
+IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a")
+
+
+def has_image_signature(stream):
+    """Vérifie les premiers octets du fichier (JPEG, PNG, GIF) sans le lire entièrement."""
+    head = stream.read(8)
+    stream.seek(0)
+    return head.startswith(IMAGE_SIGNATURES)
+
+
+@bp.route("/upload_images", methods=["POST"])
+@jwt_required()
+def upload_vehicle_images():
+    """Upload de plusieurs images (champ `files`) pour un véhicule, en une seule requête et une seule transaction."""
+    user_id = get_jwt_identity()
+    vehicle_id = request.form.get("vehicle_id", type=int)
+    if not vehicle_id:
+        return jsonify({"message": "Vehicle ID is required"}), 400
+
+    vehicle = Vehicle.query.filter_by(id=vehicle_id, owner_id=user_id).first()
+    if not vehicle:
+        return jsonify({"message": "Vehicle not found or unauthorized"}), 404
+
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"message": "No file uploaded"}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({"message": f"Too many files (max {MAX_BATCH_FILES})"}), 400
+
+    # Validation du type de chaque partie (extension + signature)
+    results = [{"file": file.filename} for file in files]
+    accepted = []
+    for result, file in zip(results, files):
+        if file.filename == "":
+            result.update(status="rejected", error="No file selected")
+        elif not allowed_file(file.filename) or not has_image_signature(file.stream):
+            result.update(status="rejected", error="Invalid file type")
+        else:
+            accepted.append((result, file))
+
+    # Copie et hachage des fichiers en parallèle, par blocs (taille vérifiée pendant la copie)
+    def stage(file):
+        return storage.stage(file.stream, file.filename.rsplit(".", 1)[1], max_size=MAX_FILE_SIZE)
+
+    staged_files = []
+    if accepted:
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(accepted))) as pool:
+            futures = [(result, pool.submit(stage, file)) for result, file in accepted]
+        for result, future in futures:
+            try:
+                staged_files.append((result, future.result()))
+            except FileTooLarge as e:
+                result.update(status="rejected", error=str(e))
+
+    # Toutes les lignes VehicleImage sont insérées dans une seule transaction
+    keys = [staged.key for _, staged in staged_files]
+    known = {
+        file_name for (file_name,) in db.session.query(VehicleImage.file_name).filter(
+            VehicleImage.vehicle_id == vehicle.id, VehicleImage.file_name.in_(keys)
+        )
+    } if keys else set()
+
+    prefix = vehicle_image_url_prefix()
+    pending = [staged for _, staged in staged_files]
+    added = 0
+    try:
+        for result, staged in staged_files:
+            pending.remove(staged)
+            if staged.key in known:
+                storage.discard(staged)
+                result["status"] = "duplicate"
+            else:
+                file_path = storage.save_staged(staged)
+                db.session.add(VehicleImage(vehicle_id=vehicle.id, file_name=staged.key, file_path=file_path))
+                known.add(staged.key)
+                result["status"] = "uploaded"
+                added += 1
+            result["file_path"] = prefix + quote(staged.key)
+
+        if added:
+            vehicle.updated_at = db.func.now()  # nouvelle version du véhicule (ETag)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for staged in pending:
+            storage.discard(staged)
+        raise
+
+    if added:
+        cache.invalidate_tags([vehicle_tag(vehicle.id)])
+
+    logger.info(f"{added} image(s) saved for vehicle {vehicle.id}")  # Débogage
+    return jsonify({"message": f"{added} image(s) uploaded", "results": results}), 200
+
+
 @bp.route("/available_vehicles", methods=["GET"])
 def get_available_vehicles():
     """Récupère la liste paginée des véhicules disponibles avec leurs images."""
     try:
-        # Paramètres de pagination
-        limit = request.args.get("limit", default=10, type=int)
-        offset = request.args.get("offset", default=0, type=int)
-
-        # Filtrer les véhicules disponibles
-        query = Vehicle.query.filter_by(available=True)
-
-        # Compter le nombre total de véhicules disponibles
-        total_count = query.count()
+        # Filtrer les véhicules disponibles (mêmes filtres que /list sans paramètre)
+        filters = parse_vehicle_filters(MultiDict())
 
-        # Appliquer la pagination
-        vehicles = query.offset(offset).limit(limit).all()
+        def build_page():
+            return vehicle_listing_page(Vehicle.query.filter_by(available=True))
 
-        return jsonify({
-            "total": total_count,
-            "limit": limit,
-            "offset": offset,
-            "vehicles": [serialize_vehicle(vehicle) for vehicle in vehicles],
-        }), 200
+        return cached_vehicle_listing(filters, build_page)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
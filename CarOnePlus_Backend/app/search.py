@@ -0,0 +1,136 @@
+import re
+
+from flask import current_app
+from sqlalchemy import DDL, Double, cast, event, func, literal_column, select, table, column
+
+from app import cache, db
+from app.cache import cache_key
+from app.models import Vehicle
+
+
+# Recherche plein texte sur title, description et localisation.
+# - PostgreSQL : index GIN sur l'expression to_tsvector ci-dessous (migration 5f3a9c1d2e47).
+#   La requête doit reproduire exactement la même expression pour que l'index soit utilisé.
+# - SQLite : table virtuelle FTS5 `vehicle_fts` tenue à jour par des triggers.
+# Trier par pertinence oblige à calculer le score de chaque résultat : au-delà de
+# SEARCH_RANK_MAX_MATCHES résultats, la recherche est triée par récence, en parcourant
+# l'index dans l'ordre des ids et en s'arrêtant à la page demandée.
+
+SEARCH_CONFIG = "simple"
+BROAD_SEARCH_CACHE_TTL = 300  # secondes : le nombre de résultats d'une recherche évolue lentement
+
+vehicle_fts = table("vehicle_fts", column("rowid"), column("rank"))
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS vehicle_fts USING fts5("
+    "title, description, localisation, content='vehicle', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS vehicle_fts_ai AFTER INSERT ON vehicle BEGIN "
+    "INSERT INTO vehicle_fts(rowid, title, description, localisation) "
+    "VALUES (new.id, new.title, new.description, new.localisation); END",
+    "CREATE TRIGGER IF NOT EXISTS vehicle_fts_ad AFTER DELETE ON vehicle BEGIN "
+    "INSERT INTO vehicle_fts(vehicle_fts, rowid, title, description, localisation) "
+    "VALUES ('delete', old.id, old.title, old.description, old.localisation); END",
+    "CREATE TRIGGER IF NOT EXISTS vehicle_fts_au AFTER UPDATE OF title, description, localisation ON vehicle BEGIN "
+    "INSERT INTO vehicle_fts(vehicle_fts, rowid, title, description, localisation) "
+    "VALUES ('delete', old.id, old.title, old.description, old.localisation); "
+    "INSERT INTO vehicle_fts(rowid, title, description, localisation) "
+    "VALUES (new.id, new.title, new.description, new.localisation); END",
+]
+
+# Les bases créées avec db.create_all() (dev local, tests) reçoivent aussi l'index FTS5
+for statement in SQLITE_FTS_DDL:
+    event.listen(Vehicle.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def search_terms(q):
+    """Découpe la saisie utilisateur en mots (lettres et chiffres uniquement)."""
+    return re.findall(r"\w+", q.lower())
+
+
+def search_document():
+    """Expression tsvector indexée côté PostgreSQL."""
+    space = literal_column("' '")
+    empty = literal_column("''")
+    return func.to_tsvector(
+        literal_column(f"'{SEARCH_CONFIG}'::regconfig"),
+        func.coalesce(Vehicle.title, empty) + space
+        + func.coalesce(Vehicle.description, empty) + space
+        + func.coalesce(Vehicle.localisation, empty),
+    )
+
+
+def _ts_query(terms):
+    return func.to_tsquery(
+        literal_column(f"'{SEARCH_CONFIG}'::regconfig"),
+        " & ".join(f"{term}:*" for term in terms),
+    )
+
+
+def _fts_match(terms):
+    return literal_column("vehicle_fts").op("MATCH")(" AND ".join(f'"{term}"*' for term in terms))
+
+
+def is_broad_search(q):
+    """
+    Vrai si `q` correspond à plus de SEARCH_RANK_MAX_MATCHES véhicules.
+    Les correspondances sont comptées dans l'index, en s'arrêtant au seuil ; le résultat est mis en cache.
+    """
+    terms = search_terms(q)
+    threshold = current_app.config["SEARCH_RANK_MAX_MATCHES"]
+    key = cache_key("search-broad", {"q": " ".join(terms), "threshold": threshold})
+    cached = cache.get(key)
+    if cached is not None:
+        return cached == "1"
+
+    if db.engine.dialect.name == "postgresql":
+        matches = select(Vehicle.id).where(search_document().op("@@")(_ts_query(terms)))
+    elif db.engine.dialect.name == "sqlite":
+        matches = select(vehicle_fts.c.rowid).where(_fts_match(terms))
+    else:
+        return False
+
+    count = db.session.execute(select(func.count()).select_from(matches.limit(threshold + 1).subquery())).scalar()
+    broad = count > threshold
+    cache.set(key, "1" if broad else "0", ttl=BROAD_SEARCH_CACHE_TTL)
+    return broad
+
+
+def apply_text_search(query, q, order="relevance"):
+    """
+    Restreint `query` aux véhicules correspondant à `q` (chaque mot, en préfixe).
+    Retourne (query, order_by) selon `order` : "relevance" (pertinence), "recent" (id décroissant),
+    ou None si l'appelant trie lui-même (order_by vaut alors None).
+    Retourne None si `q` ne contient aucun mot exploitable.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    if db.engine.dialect.name == "postgresql":
+        ts_query = _ts_query(terms)
+        document = search_document()
+        query = query.filter(document.op("@@")(ts_query))
+        if order == "relevance":
+            # ts_rank est un float4 : converti en double, le tri et le curseur (float Python) comparent la même valeur
+            return query, [(cast(func.ts_rank(document, ts_query), Double), "desc"), (Vehicle.id, "desc")]
+        return query, [(Vehicle.id, "desc")] if order == "recent" else None
+
+    if db.engine.dialect.name == "sqlite":
+        if order is None:
+            # Autre tri (prix, note) : l'ensemble des résultats est calculé une fois, puis trié.
+            # Une jointure laisserait SQLite parcourir l'index du tri en interrogeant FTS5 à chaque ligne.
+            return query.filter(Vehicle.id.in_(select(vehicle_fts.c.rowid).where(_fts_match(terms)))), None
+        query = query.join(vehicle_fts, vehicle_fts.c.rowid == Vehicle.id).filter(_fts_match(terms))
+        if order == "recent":
+            # Trié sur le rowid de l'index (= id du véhicule) : FTS5 parcourt ses résultats dans cet ordre
+            return query, [(vehicle_fts.c.rowid, "desc")]
+        # bm25 : plus le score est bas, plus le document est pertinent
+        return query, [(vehicle_fts.c.rank, "asc"), (Vehicle.id, "desc")]
+
+    # Autres bases : pas d'index plein texte, repli sur un ILIKE par mot
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.filter(
+            Vehicle.title.ilike(pattern) | Vehicle.description.ilike(pattern) | Vehicle.localisation.ilike(pattern)
+        )
+    return query, [(Vehicle.id, "desc")] if order else None
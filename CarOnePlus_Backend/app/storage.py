@@ -0,0 +1,238 @@
+import hashlib
+import os
+import re
+import tempfile
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, update
+
+
+# Stockage des fichiers par contenu : chaque fichier est rangé sous son empreinte SHA-256,
+# dans une arborescence à deux niveaux (ab/cd/abcd….jpg) pour éviter un dossier unique géant.
+# Des octets identiques ne sont stockés qu'une fois ; la table StoredFile compte les références
+# (VehicleImage, UserImage) et `flask storage gc` supprime les fichiers qui n'en ont plus.
+# Un fichier n'est rangé qu'après le commit de la transaction qui enregistre sa référence : un
+# rollback ne laisse pas de fichier sans ligne StoredFile, que gc ne verrait jamais.
+
+CHUNK_SIZE = 64 * 1024
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+EXTENSION_ALIASES = {"jpeg": "jpg"}
+
+
+class FileTooLarge(ValueError):
+    """Levée quand un envoi dépasse la taille maximale autorisée."""
+
+
+class StagedFile:
+    """Fichier reçu, haché et écrit dans un fichier temporaire, pas encore rangé dans le stockage."""
+
+    def __init__(self, key, size, tmp_path):
+        self.key = key
+        self.size = size
+        self.tmp_path = tmp_path
+
+
+def is_stored_key(name):
+    """Le nom de fichier désigne-t-il un fichier du stockage par contenu (et non un ancien upload) ?"""
+    return bool(KEY_PATTERN.match(name or ""))
+
+
+class LocalStorage:
+    """Backend disque local (production sur un volume, ou dossier temporaire pour les tests)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def stage(self, stream, extension, max_size=None):
+        """Copie le flux par blocs dans un fichier temporaire en calculant son empreinte."""
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise FileTooLarge(f"File is too large (max {max_size // (1024 * 1024)}MB)")
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        extension = EXTENSION_ALIASES.get(extension.lower(), extension.lower())
+        return StagedFile(f"{digest.hexdigest()}.{extension}", size, tmp_path)
+
+    def commit(self, staged):
+        """Range le fichier à son emplacement définitif (idempotent : le contenu est identique)."""
+        target = self.path(staged.key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(staged.tmp_path, target)
+        return target
+
+    def discard(self, staged):
+        if os.path.exists(staged.tmp_path):
+            os.remove(staged.tmp_path)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+BACKENDS = {"local": LocalStorage}
+STAGED_FILES = "storage_staged_files"
+
+
+def _upsert_reference(key, size):
+    """Incrémente le compteur de références de `key` (création si besoin), dans la transaction courante."""
+    from app.models import StoredFile, db
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        stored = db.session.get(StoredFile, key)
+        if stored is None:
+            db.session.add(StoredFile(key=key, size=size, ref_count=1))
+        else:
+            stored.ref_count = StoredFile.ref_count + 1
+        db.session.flush()
+        return
+
+    statement = insert(StoredFile.__table__).values(key=key, size=size, ref_count=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=["key"], set_={"ref_count": StoredFile.__table__.c.ref_count + 1}
+    )
+    db.session.execute(statement)
+
+
+class Storage:
+    """Extension Flask donnant accès au backend de stockage configuré (STORAGE_BACKEND)."""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = BACKENDS[app.config["STORAGE_BACKEND"]]
+        self.backend = backend(app.config["STORAGE_ROOT"])
+        app.extensions["storage"] = self
+        app.cli.add_command(storage_cli)
+
+        from app.models import UserImage, VehicleImage
+
+        for model in (VehicleImage, UserImage):
+            if not event.contains(model, "after_delete", release_stored_file):
+                event.listen(model, "after_delete", release_stored_file)
+
+        from app.models import db
+
+        for name, listener in (("after_commit", commit_staged_files), ("after_transaction_end", discard_staged_files)):
+            if not event.contains(db.session, name, listener):
+                event.listen(db.session, name, listener)
+
+    def stage(self, stream, extension, max_size=None):
+        return self.backend.stage(stream, extension, max_size)
+
+    def save_staged(self, staged):
+        """
+        Enregistre une référence vers un fichier déjà haché et retourne son chemin définitif.
+        La référence est comptée dans la transaction de la session : l'appelant commit, et le
+        fichier n'est rangé qu'à ce moment (supprimé si la transaction est annulée).
+        """
+        from app.models import db
+
+        _upsert_reference(staged.key, staged.size)
+        db.session.info.setdefault(STAGED_FILES, []).append((self.backend, staged))
+        return self.backend.path(staged.key)
+
+    def save(self, stream, extension, max_size=None):
+        """Hache et stocke un flux ; retourne (clé, chemin). Lève FileTooLarge si besoin."""
+        staged = self.stage(stream, extension, max_size)
+        try:
+            return staged.key, self.save_staged(staged)
+        except BaseException:
+            self.backend.discard(staged)
+            raise
+
+    def discard(self, staged):
+        self.backend.discard(staged)
+
+    def path(self, key):
+        return self.backend.path(key)
+
+    def exists(self, key):
+        return self.backend.exists(key)
+
+    def collect_garbage(self):
+        """Supprime les fichiers qui ne sont plus référencés. Retourne le nombre de fichiers supprimés."""
+        from app.models import StoredFile, db
+
+        removed = 0
+        keys = [key for (key,) in db.session.query(StoredFile.key).filter(StoredFile.ref_count <= 0)]
+        for key in keys:
+            # La ligne supprimée reste verrouillée jusqu'au commit : un envoi simultané du même
+            # contenu attend, puis recrée la ligne et le fichier après la suppression.
+            deleted = db.session.query(StoredFile).filter(
+                StoredFile.key == key, StoredFile.ref_count <= 0
+            ).delete(synchronize_session=False)
+            if deleted:
+                self.backend.delete(key)
+                removed += 1
+            db.session.commit()
+        return removed
+
+
+storage_cli = AppGroup("storage", help="Gestion du stockage des fichiers.")
+
+
+@storage_cli.command("gc")
+def storage_gc():
+    """Supprime les fichiers stockés qui ne sont plus référencés."""
+    from app import storage
+
+    click.echo(f"{storage.collect_garbage()} file(s) removed")
+
+
+def commit_staged_files(session):
+    """Range les fichiers dont la référence vient d'être validée."""
+    staged_files = session.info.get(STAGED_FILES)
+    while staged_files:
+        backend, staged = staged_files[0]
+        backend.commit(staged)
+        staged_files.pop(0)
+
+
+def discard_staged_files(session, transaction):
+    """Fin de la transaction principale sans commit (rollback, fermeture) : supprime les fichiers en attente."""
+    if transaction.parent is not None:
+        return
+    for backend, staged in session.info.pop(STAGED_FILES, []):
+        backend.discard(staged)
+
+
+def release_stored_file(mapper, connection, target):
+    """Décrémente le compteur quand une image est supprimée (y compris par cascade ORM)."""
+    from app.models import StoredFile
+
+    table = StoredFile.__table__
+    connection.execute(
+        update(table).where(table.c.key == target.file_name).values(ref_count=table.c.ref_count - 1)
+    )
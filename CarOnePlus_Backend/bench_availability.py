@@ -0,0 +1,149 @@
+"""
+Mesure le filtre par dates de /vehicles/list (start_date / end_date) : anti-jointure NOT EXISTS
+sur les réservations, avec puis sans l'index ix_reservation_vehicle_dates_status.
+
+Usage : DATABASE_URL=postgresql://... python bench_availability.py [nombre_de_reservations] [nombre_de_vehicules]
+Sans DATABASE_URL, une base SQLite temporaire est utilisée.
+Sous PostgreSQL, la contrainte d'exclusion (GiST) reste en place pendant la mesure sans index.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+if not os.environ.get("DATABASE_URL"):
+    _tmp = tempfile.mkdtemp(prefix="caroneplus-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "bench.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Reservation, User, Vehicle  # noqa: E402
+from app.routes.vehicles import bookable_between  # noqa: E402
+
+AVAILABILITY_INDEX = "ix_reservation_vehicle_dates_status"
+PAGE_SIZE = 20
+RUNS = 5
+BATCH = 10000
+
+
+def periods(today):
+    """Périodes recherchées : week-end proche, semaine dans un mois, journée dans six mois, quinzaine passée."""
+    saturday = today + timedelta(days=(5 - today.weekday()) % 7 or 7)
+    return [
+        ("week-end", saturday, saturday + timedelta(days=1)),
+        ("semaine +1 mois", today + timedelta(days=30), today + timedelta(days=36)),
+        ("journée +6 mois", today + timedelta(days=180), today + timedelta(days=180)),
+        ("quinzaine passée", today - timedelta(days=60), today - timedelta(days=46)),
+    ]
+
+
+def seed(reservation_count, vehicle_count, today):
+    owner = User(email="bench@example.com", password="x", is_active=True)
+    db.session.add(owner)
+    db.session.commit()
+
+    for offset in range(0, vehicle_count, BATCH):
+        db.session.execute(insert(Vehicle), [
+            {
+                "owner_id": owner.id,
+                "title": f"Vehicle {offset + i}",
+                "description": "Description",
+                "price_per_day": 50,
+                "localisation": "Paris",
+                "available": True,
+            }
+            for i in range(min(BATCH, vehicle_count - offset))
+        ])
+        db.session.commit()
+    vehicle_ids = [vehicle_id for (vehicle_id,) in db.session.query(Vehicle.id)]
+
+    # Réservations successives sans chevauchement par véhicule, réparties sur deux ans autour
+    # d'aujourd'hui : passées terminées, futures confirmées ou en attente, quelques-unes expirées
+    rng = random.Random(42)
+    per_vehicle = max(1, reservation_count // len(vehicle_ids))
+    slot = max(2, 730 // per_vehicle)
+    rows = []
+    for vehicle_id in vehicle_ids:
+        slot_start = today - timedelta(days=365 + rng.randint(0, slot - 1))
+        for _ in range(per_vehicle):
+            start = slot_start + timedelta(days=rng.randint(0, slot // 2))
+            end = start + timedelta(days=rng.randint(0, max(0, min(6, slot - 2 - (start - slot_start).days))))
+            if rng.random() < 0.05:
+                status = "EXPIRER"
+            elif end < today:
+                status = "TERMINER"
+            else:
+                status = "EN ATTENTE" if rng.random() < 0.1 else "CONFIRMER"
+            rows.append({
+                "user_id": owner.id, "vehicle_id": vehicle_id, "start_date": start, "end_date": end, "status": status,
+            })
+            slot_start += timedelta(days=slot)
+            if len(rows) == BATCH:
+                db.session.execute(insert(Reservation), rows)
+                db.session.commit()
+                rows = []
+    if rows:
+        db.session.execute(insert(Reservation), rows)
+        db.session.commit()
+
+
+def timed(run, runs=RUNS):
+    """Médiane (ms) de `runs` exécutions, et le résultat de la dernière."""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run()
+        durations.append((time.perf_counter() - start) * 1000)
+        db.session.expire_all()
+    return statistics.median(durations), result
+
+
+def measure(today, runs=RUNS, with_total=True):
+    """
+    Temps de la première page (tri du catalogue : id décroissant) et du total (with_total=true), par période.
+    Sans index, chaque véhicule parcourt toute la table des réservations : le total (véhicules x réservations)
+    n'est mesuré qu'avec l'index.
+    """
+    results = []
+    for label, start_date, end_date in periods(today):
+        query = bookable_between(start_date, end_date)
+        page, _ = timed(lambda: query.order_by(Vehicle.id.desc()).limit(PAGE_SIZE).all(), runs)
+        total, count = timed(lambda: query.count(), runs) if with_total else (None, None)
+        results.append((label, count, page, total))
+    return results
+
+
+def main():
+    reservation_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    vehicle_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    today = date.today()
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if not Reservation.query.first():
+            seed(reservation_count, vehicle_count, today)
+
+        index = next(i for i in Reservation.__table__.indexes if i.name == AVAILABILITY_INDEX)
+        with_index = measure(today)
+        index.drop(db.engine)
+        try:
+            without_index = measure(today, runs=1, with_total=False)
+        finally:
+            index.create(db.engine)
+
+        print(
+            f"{db.engine.dialect.name}, {Reservation.query.count()} réservations, {Vehicle.query.count()} véhicules, "
+            f"page de {PAGE_SIZE}, médiane de {RUNS} essais"
+        )
+        print(f"{'période':<18}{'libres':>8}{'page index':>12}{'page sans':>11}{'total index':>13}")
+        for (label, count, page, total), (_, _, page_scan, _) in zip(with_index, without_index):
+            print(f"{label:<18}{count:>8}{page:>12.1f}{page_scan:>11.1f}{total:>13.1f}")
+        print("temps en ms ; sans index : un seul essai, sans le total")
+
+
+if __name__ == "__main__":
+    main()
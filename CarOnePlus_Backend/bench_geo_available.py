@@ -0,0 +1,137 @@
+"""
+Latence de GET /geo/available ("voitures libres près de moi ce week-end") : p50 / p95 de requêtes
+complètes (lecture des paramètres, requête SQL, sérialisation JSON) sur des positions et des périodes
+tirées au hasard, comparés à l'objectif P95_TARGET_MS.
+
+Usage : DATABASE_URL=postgresql://... python bench_geo_available.py [véhicules] [réservations] [requêtes]
+Sans DATABASE_URL, une base SQLite temporaire est utilisée.
+Code de sortie 1 si le p95 dépasse l'objectif (GEO_AVAILABLE_P95_TARGET_MS, 50 ms par défaut).
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+if not os.environ.get("DATABASE_URL"):
+    _tmp = tempfile.mkdtemp(prefix="caroneplus-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "bench.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Reservation, User, Vehicle  # noqa: E402
+
+P95_TARGET_MS = float(os.environ.get("GEO_AVAILABLE_P95_TARGET_MS", 50))
+CITIES = [(48.8566, 2.3522), (45.7640, 4.8357), (43.2965, 5.3698), (50.6292, 3.0573), (44.8378, -0.5792)]
+RADII = [2, 5, 10, 25]
+PAGE_SIZE = 20
+WARMUP = 20
+BATCH = 10000
+
+
+def seed(vehicle_count, reservation_count, today):
+    owner = User(email="bench@example.com", password="x", is_active=True)
+    db.session.add(owner)
+    db.session.commit()
+
+    rng = random.Random(42)
+    for offset in range(0, vehicle_count, BATCH):
+        rows = []
+        for i in range(min(BATCH, vehicle_count - offset)):
+            lat, lng = rng.choice(CITIES)
+            rows.append({
+                "owner_id": owner.id, "title": f"Vehicle {offset + i}", "description": "Description",
+                "price_per_day": rng.randint(20, 200), "localisation": "France",
+                "lat": rng.gauss(lat, 0.27), "lng": rng.gauss(lng, 0.4), "available": rng.random() < 0.95,
+            })
+        db.session.execute(insert(Vehicle), rows)
+        db.session.commit()
+    vehicle_ids = [vehicle_id for (vehicle_id,) in db.session.query(Vehicle.id)]
+
+    # Réservations sans chevauchement par véhicule sur l'année à venir (et la précédente)
+    per_vehicle = max(1, reservation_count // len(vehicle_ids))
+    slot = max(2, 730 // per_vehicle)
+    rows = []
+    for vehicle_id in vehicle_ids:
+        slot_start = today - timedelta(days=365 + rng.randint(0, slot - 1))
+        for _ in range(per_vehicle):
+            start = slot_start + timedelta(days=rng.randint(0, slot // 2))
+            end = start + timedelta(days=rng.randint(0, max(0, min(6, slot - 2 - (start - slot_start).days))))
+            status = "TERMINER" if end < today else rng.choice(["CONFIRMER", "CONFIRMER", "EN ATTENTE", "EXPIRER"])
+            rows.append({
+                "user_id": owner.id, "vehicle_id": vehicle_id, "start_date": start, "end_date": end, "status": status,
+            })
+            slot_start += timedelta(days=slot)
+            if len(rows) == BATCH:
+                db.session.execute(insert(Reservation), rows)
+                db.session.commit()
+                rows = []
+    if rows:
+        db.session.execute(insert(Reservation), rows)
+        db.session.commit()
+
+
+def random_search(rng, today):
+    """Position proche d'une ville, rayon et période (1 à 7 jours dans les trois mois) au hasard ; retourne (rayon, url)."""
+    lat, lng = rng.choice(CITIES)
+    radius = rng.choice(RADII)
+    start = today + timedelta(days=rng.randint(0, 90))
+    end = start + timedelta(days=rng.randint(0, 6))
+    return radius, (
+        f"/geo/available?lat={rng.gauss(lat, 0.1):.5f}&lng={rng.gauss(lng, 0.1):.5f}&radius={radius}"
+        f"&start_date={start.isoformat()}&end_date={end.isoformat()}&limit={PAGE_SIZE}"
+    )
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def main():
+    vehicle_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    reservation_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    request_count = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    today = date.today()
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if not Vehicle.query.first():
+            seed(vehicle_count, reservation_count, today)
+        vehicles, reservations = Vehicle.query.count(), Reservation.query.count()
+
+    client = app.test_client()
+    rng = random.Random(7)
+    for _ in range(WARMUP):
+        client.get(random_search(rng, today)[1])
+
+    durations, returned, by_radius = [], [], {radius: [] for radius in RADII}
+    for _ in range(request_count):
+        radius, url = random_search(rng, today)
+        start = time.perf_counter()
+        response = client.get(url)
+        duration = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            sys.exit(f"{url} -> {response.status_code} {response.get_data(as_text=True)}")
+        durations.append(duration)
+        by_radius[radius].append(duration)
+        returned.append(len(response.get_json()["vehicles"]))
+
+    p50, p95 = percentile(durations, 50), percentile(durations, 95)
+    print(f"{app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]}, {vehicles} véhicules, {reservations} réservations")
+    print(
+        f"{request_count} requêtes, page de {PAGE_SIZE} (moyenne renvoyée {statistics.mean(returned):.1f}) : "
+        f"p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {max(durations):.1f} ms"
+    )
+    for radius, values in by_radius.items():
+        if values:
+            print(f"  rayon {radius:>2} km : {len(values):>4} requêtes, p50 {percentile(values, 50):.1f} ms, p95 {percentile(values, 95):.1f} ms")
+    print(f"objectif p95 <= {P95_TARGET_MS:.0f} ms : {'OK' if p95 <= P95_TARGET_MS else 'DÉPASSÉ'}")
+    sys.exit(0 if p95 <= P95_TARGET_MS else 1)
+
+
+if __name__ == "__main__":
+    main()
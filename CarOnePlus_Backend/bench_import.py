@@ -0,0 +1,113 @@
+"""
+Débit de l'import en masse (app.importer.import_vehicles) : génère un fichier CSV et un fichier NDJSON
+de N véhicules, les importe et affiche lignes par seconde et pic mémoire.
+
+Usage : DATABASE_URL=postgresql://... python bench_import.py [nombre_de_lignes] [taille_de_lot]
+Sans DATABASE_URL, une base SQLite temporaire est utilisée. Le géocodage des véhicules importés passe
+par le géocodeur statique (sans réseau) sauf si GEOCODER est défini.
+Le pic mémoire (tracemalloc, allocations Python) est mesuré sur un second passage, tracemalloc
+ralentissant l'import ; le débit vient du premier.
+"""
+import csv
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_tmp = tempfile.mkdtemp(prefix="caroneplus-bench-")
+if not os.environ.get("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "bench.db")
+os.environ.setdefault("GEOCODER", "static")
+
+from app import create_app, db  # noqa: E402
+from app.importer import import_vehicles  # noqa: E402
+from app.models import User, Vehicle  # noqa: E402
+
+BRANDS = ["Renault Clio", "Peugeot 208", "Citroen C3", "Toyota Yaris", "Volkswagen Golf", "Tesla Model 3"]
+CITIES = ["Paris", "Lyon", "Marseille", "Toulouse", "Nice", "Nantes", "Bordeaux", "Lille"]
+FIELDS = [
+    "title", "description", "price_per_day", "type_de_vehicule", "type_de_carburant", "localisation",
+    "puissance", "transmission", "vitesse", "nbreSieges", "available",
+]
+
+
+def generate(count, directory):
+    """Écrit `count` lignes au format CSV et NDJSON ; retourne {format: chemin}."""
+    rng = random.Random(42)
+    paths = {"csv": os.path.join(directory, "vehicles.csv"), "ndjson": os.path.join(directory, "vehicles.ndjson")}
+    with open(paths["csv"], "w", newline="", encoding="utf-8") as csv_file, \
+            open(paths["ndjson"], "w", encoding="utf-8") as ndjson_file:
+        writer = csv.DictWriter(csv_file, fieldnames=FIELDS)
+        writer.writeheader()
+        for i in range(count):
+            row = {
+                "title": f"{rng.choice(BRANDS)} #{i}",
+                "description": "Véhicule de flotte, entretien constructeur, climatisation, GPS.",
+                "price_per_day": rng.randint(20, 200),
+                "type_de_vehicule": rng.choice(["citadine", "berline", "SUV", "utilitaire"]),
+                "type_de_carburant": rng.choice(["essence", "diesel", "electrique", "hybride"]),
+                "localisation": rng.choice(CITIES),
+                "puissance": f"{rng.randint(70, 300)} ch",
+                "transmission": rng.choice(["manuelle", "automatique"]),
+                "vitesse": f"{rng.randint(150, 250)} km/h",
+                "nbreSieges": rng.choice([2, 4, 5, 7, 9]),
+                "available": rng.choice(["true", "false"]),
+            }
+            writer.writerow(row)
+            ndjson_file.write(json.dumps(row) + "\n")
+    return paths
+
+
+def run(path, fmt, owner_id, batch_size, dry_run=False, trace=False):
+    """Importe le fichier ; retourne (durée en s, rapport, pic tracemalloc en octets ou None)."""
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, "rb") as stream:
+        report = import_vehicles(stream, fmt, owner_id, batch_size=batch_size, dry_run=dry_run)
+    duration = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    if not dry_run:
+        Vehicle.query.delete()
+        db.session.commit()
+    return duration, report, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    paths = generate(count, _tmp)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        owner = User(email="bench@example.com", password="x", is_active=True)
+        db.session.add(owner)
+        db.session.commit()
+
+        print(f"{db.engine.dialect.name}, {count} lignes, lots de {batch_size}")
+        print(f"{'format':<16}{'durée (s)':>10}{'lignes/s':>10}{'insérées':>10}{'pic (Mo)':>10}")
+        for fmt, path in paths.items():
+            for dry_run in (True, False):
+                duration, report, _ = run(path, fmt, owner.id, batch_size, dry_run)
+                _, _, peak = run(path, fmt, owner.id, batch_size, dry_run, trace=True)
+                if report["rejected"]:
+                    sys.exit(f"{fmt}: {report['rejected']} lignes rejetées : {report['errors'][:3]}")
+                label = f"{fmt}{' (dry-run)' if dry_run else ''}"
+                print(
+                    f"{label:<16}{duration:>10.2f}{count / duration:>10.0f}{report['inserted']:>10}"
+                    f"{peak / 1024 / 1024:>10.1f}"
+                )
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"dry-run : lecture et validation seules ; RSS max du processus {max_rss:.0f} Mo")
+
+
+if __name__ == "__main__":
+    main()
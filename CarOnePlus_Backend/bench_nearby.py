@@ -0,0 +1,118 @@
+"""
+Compare /geo/nearby à l'ancienne requête : filtre pow(lat - x, 2) + pow(lng - y, 2) <= pow(rayon / 111, 2)
+sans index ni tri, contre boîte englobante indexée + haversine, triée par distance.
+
+Usage : DATABASE_URL=postgresql://... python bench_nearby.py [nombre_de_vehicules]
+Sans DATABASE_URL, une base SQLite temporaire est utilisée.
+La colonne "exacts" compte les véhicules réellement dans le rayon (haversine) ; "ancienne" ce que
+renvoyait l'ancienne requête, qui ignore le rétrécissement des longitudes avec la latitude.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+if not os.environ.get("DATABASE_URL"):
+    _tmp = tempfile.mkdtemp(prefix="caroneplus-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "bench.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.geo import within_radius  # noqa: E402
+from app.models import User, Vehicle  # noqa: E402
+
+# Villes autour desquelles les véhicules sont répartis, dont une au-delà du cercle polaire
+CITIES = {
+    "Paris": (48.8566, 2.3522),
+    "Lyon": (45.7640, 4.8357),
+    "Marseille": (43.2965, 5.3698),
+    "Lille": (50.6292, 3.0573),
+    "Tromsø": (69.6492, 18.9553),
+}
+SEARCHES = [("Paris", 2), ("Paris", 10), ("Lyon", 25), ("Marseille", 50), ("Tromsø", 10)]
+PAGE_SIZE = 20
+RUNS = 5
+BATCH = 10000
+
+
+def seed(count):
+    owner = User(email="bench@example.com", password="x", is_active=True)
+    db.session.add(owner)
+    db.session.commit()
+
+    # 90 % autour des villes (écart-type ~30 km), le reste réparti sur l'Europe
+    rng = random.Random(42)
+    centers = list(CITIES.values())
+    for offset in range(0, count, BATCH):
+        rows = []
+        for i in range(min(BATCH, count - offset)):
+            if rng.random() < 0.9:
+                lat, lng = rng.choice(centers)
+                lat, lng = rng.gauss(lat, 0.27), rng.gauss(lng, 0.4)
+            else:
+                lat, lng = rng.uniform(36, 71), rng.uniform(-10, 30)
+            rows.append({
+                "owner_id": owner.id, "title": f"Vehicle {offset + i}", "description": "Description",
+                "price_per_day": 50, "localisation": "Europe", "lat": lat, "lng": lng,
+            })
+        db.session.execute(insert(Vehicle), rows)
+        db.session.commit()
+
+
+def pow_query(lat, lng, radius):
+    """Requête de l'ancienne route /geo/nearby."""
+    return db.session.query(Vehicle).filter(
+        Vehicle.lat.isnot(None),
+        Vehicle.lng.isnot(None),
+    ).filter(
+        db.func.pow(Vehicle.lat - lat, 2) + db.func.pow(Vehicle.lng - lng, 2) <= db.func.pow(radius / 111, 2)
+    )
+
+
+def indexed_query(lat, lng, radius):
+    """Requête de nearby_page : boîte englobante + haversine, triée par distance."""
+    query, distance = within_radius(Vehicle.query, lat, lng, radius)
+    return query.order_by(distance, Vehicle.id)
+
+
+def timed(run):
+    """Médiane (ms) de RUNS exécutions, et le résultat de la dernière."""
+    durations = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = run()
+        durations.append((time.perf_counter() - start) * 1000)
+        db.session.expunge_all()
+    return statistics.median(durations), result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if not Vehicle.query.first():
+            seed(count)
+
+        print(f"{db.engine.dialect.name}, {Vehicle.query.count()} véhicules, médiane de {RUNS} essais")
+        print(
+            f"{'recherche':<16}{'exacts':>8}{'ancienne':>10}{'pow (ms)':>10}"
+            f"{'page (ms)':>11}{'rayon (ms)':>12}"
+        )
+        for city, radius in SEARCHES:
+            lat, lng = CITIES[city]
+            legacy, legacy_rows = timed(lambda: pow_query(lat, lng, radius).all())
+            page, _ = timed(lambda: indexed_query(lat, lng, radius).limit(PAGE_SIZE).all())
+            everything, rows = timed(lambda: indexed_query(lat, lng, radius).all())
+            print(
+                f"{f'{city} {radius} km':<16}{len(rows):>8}{len(legacy_rows):>10}{legacy:>10.1f}"
+                f"{page:>11.1f}{everything:>12.1f}"
+            )
+        print(f"page : {PAGE_SIZE} premiers véhicules par distance ; rayon : tous les véhicules du rayon, triés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Mesure la recherche ?q= de /vehicles/list : index plein texte (app.search) contre un ILIKE
+par mot sur title, description et localisation (ancien comportement / repli sans index).
+L'index est mesuré trié par pertinence, trié par récence, et avec le choix fait par /vehicles/list
+(récence au-delà de SEARCH_RANK_MAX_MATCHES résultats ; ce comptage est mis en cache dès le premier essai).
+
+Usage : DATABASE_URL=postgresql://... python bench_search.py [nombre_de_vehicules]
+Sans DATABASE_URL, une base SQLite temporaire est utilisée (FTS5).
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+if not os.environ.get("DATABASE_URL"):
+    _tmp = tempfile.mkdtemp(prefix="caroneplus-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "bench.db")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Vehicle  # noqa: E402
+from app.search import apply_text_search, is_broad_search, search_terms  # noqa: E402
+from app.pagination import order_clauses  # noqa: E402
+
+BRANDS = ["Renault", "Peugeot", "Citroen", "Toyota", "Volkswagen", "Tesla", "BMW", "Fiat", "Dacia", "Kia"]
+MODELS = ["Clio", "208", "C3", "Yaris", "Golf", "Model 3", "Serie 1", "Panda", "Sandero", "Niro"]
+WORDS = [
+    "climatisation", "automatique", "manuelle", "diesel", "essence", "electrique", "hybride",
+    "gps", "bluetooth", "familiale", "citadine", "spacieuse", "economique", "recente", "camera",
+    "recul", "toit", "panoramique", "coffre", "sieges", "chauffants", "propre", "entretenue",
+]
+CITIES = ["Paris", "Lyon", "Marseille", "Toulouse", "Nice", "Nantes", "Bordeaux", "Lille", "Rennes", "Strasbourg"]
+# Requêtes fréquentes (des milliers de résultats) puis sélectives (peu ou pas de résultats)
+QUERIES = ["clio", "hybride gps", "panoramique", "tesla lyon", "peugeot 208 paris", "kia niro rennes", "cabriolet"]
+PAGE_SIZE = 20
+RUNS = 5
+
+
+def seed(count):
+    owner = User(email="bench@example.com", password="x", is_active=True)
+    db.session.add(owner)
+    db.session.commit()
+
+    rng = random.Random(42)
+    for offset in range(0, count, 10000):
+        rows = [
+            {
+                "owner_id": owner.id,
+                "title": f"{rng.choice(BRANDS)} {rng.choice(MODELS)}",
+                "description": " ".join(rng.choices(WORDS, k=25)),
+                "price_per_day": rng.randint(20, 200),
+                "localisation": rng.choice(CITIES),
+            }
+            for _ in range(min(10000, count - offset))
+        ]
+        db.session.execute(insert(Vehicle), rows)
+        db.session.commit()
+
+
+def ilike_search(query, q):
+    for term in search_terms(q):
+        pattern = f"%{term}%"
+        query = query.filter(
+            Vehicle.title.ilike(pattern) | Vehicle.description.ilike(pattern) | Vehicle.localisation.ilike(pattern)
+        )
+    return query.order_by(Vehicle.id.desc())
+
+
+def ranked_search(query, q):
+    query, order_by = apply_text_search(query, q, order="relevance")
+    return query.order_by(*order_clauses(order_by))
+
+
+def recent_search(query, q):
+    query, order_by = apply_text_search(query, q, order="recent")
+    return query.order_by(*order_clauses(order_by))
+
+
+def listing_search(query, q):
+    """Choix de /vehicles/list pour une première page sans `sort`."""
+    query, order_by = apply_text_search(query, q, order="recent" if is_broad_search(q) else "relevance")
+    return query.order_by(*order_clauses(order_by))
+
+
+def timed(build, q):
+    """Médiane (ms) de RUNS exécutions de la première page, et nombre de résultats renvoyés."""
+    durations = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        rows = build(Vehicle.query, q).limit(PAGE_SIZE).all()
+        durations.append((time.perf_counter() - start) * 1000)
+        db.session.expire_all()
+    return statistics.median(durations), len(rows)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if not Vehicle.query.first():
+            seed(count)
+        print(f"{db.engine.dialect.name}, {Vehicle.query.count()} véhicules, page de {PAGE_SIZE}, médiane de {RUNS} essais")
+        print(f"seuil de tri par pertinence : {app.config['SEARCH_RANK_MAX_MATCHES']} résultats")
+        print(f"{'q':<22}{'résultats':>10}{'pertinence':>12}{'récence':>10}{'/list':>8}{'ilike':>8}")
+        for q in QUERIES:
+            matches = ilike_search(Vehicle.query, q).order_by(None).count()
+            ranked, _ = timed(ranked_search, q)
+            recent, _ = timed(recent_search, q)
+            listing, _ = timed(listing_search, q)
+            scanned, _ = timed(ilike_search, q)
+            print(f"{q:<22}{matches:>10}{ranked:>12.1f}{recent:>10.1f}{listing:>8.1f}{scanned:>8.1f}")
+        print("temps en ms")
+
+
+if __name__ == "__main__":
+    main()
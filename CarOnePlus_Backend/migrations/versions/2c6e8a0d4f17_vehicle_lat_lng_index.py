@@ -0,0 +1,26 @@
+"""vehicle lat lng index
+
+Revision ID: 2c6e8a0d4f17
+Revises: e91b3f6a2d04
+Create Date: 2026-10-18 17:05:51.230918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c6e8a0d4f17'
+down_revision = 'e91b3f6a2d04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.create_index('ix_vehicle_lat_lng', ['lat', 'lng'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.drop_index('ix_vehicle_lat_lng')
@@ -0,0 +1,39 @@
+"""content addressed storage
+
+Revision ID: 3b7d5e9f0a12
+Revises: 8c4e2b7a1f90
+Create Date: 2026-10-18 11:26:05.304917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7d5e9f0a12'
+down_revision = '8c4e2b7a1f90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stored_file',
+    sa.Column('key', sa.String(length=80), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+    # Un même fichier peut désormais être partagé entre plusieurs véhicules
+    with op.batch_alter_table('vehicle_image', schema=None) as batch_op:
+        batch_op.drop_constraint('vehicle_image_file_name_key', type_='unique')
+        batch_op.create_unique_constraint('uq_vehicle_image_vehicle_file', ['vehicle_id', 'file_name'])
+
+
+def downgrade():
+    with op.batch_alter_table('vehicle_image', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_vehicle_image_vehicle_file', type_='unique')
+        batch_op.create_unique_constraint('vehicle_image_file_name_key', ['file_name'])
+
+    op.drop_table('stored_file')
@@ -0,0 +1,26 @@
+"""vehicle owner index
+
+Revision ID: 4f8b2d6c0e39
+Revises: 9d5c3e7b2a61
+Create Date: 2026-10-18 20:02:14.518327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8b2d6c0e39'
+down_revision = '9d5c3e7b2a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.create_index('ix_vehicle_owner_id', ['owner_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.drop_index('ix_vehicle_owner_id')
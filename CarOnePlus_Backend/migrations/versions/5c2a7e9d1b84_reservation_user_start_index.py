@@ -0,0 +1,26 @@
+"""reservation user start index
+
+Revision ID: 5c2a7e9d1b84
+Revises: b6e1d9f3a742
+Create Date: 2026-10-18 20:58:03.271164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2a7e9d1b84'
+down_revision = 'b6e1d9f3a742'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.create_index('ix_reservation_user_start', ['user_id', 'start_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservation_user_start')
@@ -0,0 +1,68 @@
+"""vehicle full text search index
+
+Revision ID: 5f3a9c1d2e47
+Revises: 1b16a7da9417
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f3a9c1d2e47'
+down_revision = '1b16a7da9417'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_TRIGGERS = ['vehicle_fts_ai', 'vehicle_fts_ad', 'vehicle_fts_au']
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # Doit rester identique à app.search.search_document()
+        op.execute(
+            "CREATE INDEX ix_vehicle_search ON vehicle USING GIN ("
+            "to_tsvector('simple'::regconfig, coalesce(title, '') || ' ' || "
+            "coalesce(description, '') || ' ' || coalesce(localisation, '')))"
+        )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE vehicle_fts USING fts5("
+            "title, description, localisation, content='vehicle', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER vehicle_fts_ai AFTER INSERT ON vehicle BEGIN "
+            "INSERT INTO vehicle_fts(rowid, title, description, localisation) "
+            "VALUES (new.id, new.title, new.description, new.localisation); END"
+        )
+        op.execute(
+            "CREATE TRIGGER vehicle_fts_ad AFTER DELETE ON vehicle BEGIN "
+            "INSERT INTO vehicle_fts(vehicle_fts, rowid, title, description, localisation) "
+            "VALUES ('delete', old.id, old.title, old.description, old.localisation); END"
+        )
+        op.execute(
+            "CREATE TRIGGER vehicle_fts_au AFTER UPDATE OF title, description, localisation ON vehicle BEGIN "
+            "INSERT INTO vehicle_fts(vehicle_fts, rowid, title, description, localisation) "
+            "VALUES ('delete', old.id, old.title, old.description, old.localisation); "
+            "INSERT INTO vehicle_fts(rowid, title, description, localisation) "
+            "VALUES (new.id, new.title, new.description, new.localisation); END"
+        )
+        # Indexer les véhicules existants
+        op.execute("INSERT INTO vehicle_fts(vehicle_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_vehicle_search")
+
+    elif dialect == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS vehicle_fts")
@@ -0,0 +1,36 @@
+"""vehicle rating aggregates
+
+Revision ID: 6a1d4c8e2b35
+Revises: 3b7d5e9f0a12
+Create Date: 2026-10-18 14:21:05.318447
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1d4c8e2b35'
+down_revision = '3b7d5e9f0a12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Reprise des avis existants
+    op.execute(
+        "UPDATE vehicle SET "
+        "rating_sum = (SELECT coalesce(sum(review.rating), 0) FROM review WHERE review.vehicle_id = vehicle.id), "
+        "rating_count = (SELECT count(*) FROM review WHERE review.vehicle_id = vehicle.id) "
+        "WHERE EXISTS (SELECT 1 FROM review WHERE review.vehicle_id = vehicle.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,31 @@
+"""geocode cache
+
+Revision ID: 7e2f9b4c1a83
+Revises: 2c6e8a0d4f17
+Create Date: 2026-10-18 17:48:12.604219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2f9b4c1a83'
+down_revision = '2c6e8a0d4f17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('geocode_cache',
+    sa.Column('key', sa.String(length=40), nullable=False),
+    sa.Column('address', sa.Text(), nullable=False),
+    sa.Column('lat', sa.Float(), nullable=True),
+    sa.Column('lng', sa.Float(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('geocode_cache')
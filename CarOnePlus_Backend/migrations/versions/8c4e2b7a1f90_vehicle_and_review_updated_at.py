@@ -0,0 +1,38 @@
+"""vehicle and review updated_at
+
+Revision ID: 8c4e2b7a1f90
+Revises: 5f3a9c1d2e47
+Create Date: 2026-10-18 10:03:17.552841
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2b7a1f90'
+down_revision = '5f3a9c1d2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True))
+
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True))
+        batch_op.create_index(batch_op.f('ix_review_vehicle_id'), ['vehicle_id'], unique=False)
+
+    # Les lignes existantes n'ont pas été modifiées depuis leur création
+    op.execute("UPDATE vehicle SET updated_at = created_at WHERE created_at IS NOT NULL")
+    op.execute("UPDATE review SET updated_at = created_at WHERE created_at IS NOT NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_review_vehicle_id'))
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,61 @@
+"""reservation no overlap
+
+Revision ID: 9d5c3e7b2a61
+Revises: 7e2f9b4c1a83
+Create Date: 2026-10-18 19:12:37.880145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d5c3e7b2a61'
+down_revision = '7e2f9b4c1a83'
+branch_labels = None
+depends_on = None
+
+
+# Doit rester identique à app.booking (statuts bloquants : CONFIRMER, EN ATTENTE).
+# Les doubles réservations déjà présentes en base doivent être résolues avant la migration.
+BLOCKING = "'CONFIRMER', 'EN ATTENTE'"
+
+SQLITE_OVERLAP = (
+    f"NEW.status IN ({BLOCKING}) AND EXISTS (SELECT 1 FROM reservation AS other "
+    f"WHERE other.vehicle_id = NEW.vehicle_id AND other.status IN ({BLOCKING}) "
+    f"AND other.start_date <= NEW.end_date AND other.end_date >= NEW.start_date"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute(
+            "ALTER TABLE reservation ADD CONSTRAINT reservation_no_overlap EXCLUDE USING gist ("
+            f"vehicle_id WITH =, daterange(start_date, end_date, '[]') WITH &&) WHERE (status IN ({BLOCKING}))"
+        )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE TRIGGER reservation_no_overlap_insert BEFORE INSERT ON reservation "
+            f"WHEN {SQLITE_OVERLAP}) "
+            "BEGIN SELECT RAISE(ABORT, 'reservation_no_overlap'); END"
+        )
+        op.execute(
+            "CREATE TRIGGER reservation_no_overlap_update BEFORE UPDATE OF vehicle_id, start_date, end_date, status ON reservation "
+            f"WHEN {SQLITE_OVERLAP} AND other.id != NEW.id) "
+            "BEGIN SELECT RAISE(ABORT, 'reservation_no_overlap'); END"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("ALTER TABLE reservation DROP CONSTRAINT IF EXISTS reservation_no_overlap")
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS reservation_no_overlap_insert")
+        op.execute("DROP TRIGGER IF EXISTS reservation_no_overlap_update")
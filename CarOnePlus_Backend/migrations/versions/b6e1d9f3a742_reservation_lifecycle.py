@@ -0,0 +1,69 @@
+"""reservation lifecycle
+
+Revision ID: b6e1d9f3a742
+Revises: 4f8b2d6c0e39
+Create Date: 2026-10-18 20:31:45.902716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1d9f3a742'
+down_revision = '4f8b2d6c0e39'
+branch_labels = None
+depends_on = None
+
+
+# Statuts bloquants avant / après l'ajout de EN COURS ; doivent rester identiques à app.booking.
+OLD_BLOCKING = "'CONFIRMER', 'EN ATTENTE'"
+NEW_BLOCKING = "'CONFIRMER', 'EN ATTENTE', 'EN COURS'"
+
+
+def sqlite_overlap(blocking):
+    return (
+        f"NEW.status IN ({blocking}) AND EXISTS (SELECT 1 FROM reservation AS other "
+        f"WHERE other.vehicle_id = NEW.vehicle_id AND other.status IN ({blocking}) "
+        f"AND other.start_date <= NEW.end_date AND other.end_date >= NEW.start_date"
+    )
+
+
+def replace_overlap_guard(blocking):
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("ALTER TABLE reservation DROP CONSTRAINT IF EXISTS reservation_no_overlap")
+        op.execute(
+            "ALTER TABLE reservation ADD CONSTRAINT reservation_no_overlap EXCLUDE USING gist ("
+            f"vehicle_id WITH =, daterange(start_date, end_date, '[]') WITH &&) WHERE (status IN ({blocking}))"
+        )
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS reservation_no_overlap_insert")
+        op.execute("DROP TRIGGER IF EXISTS reservation_no_overlap_update")
+        op.execute(
+            "CREATE TRIGGER reservation_no_overlap_insert BEFORE INSERT ON reservation "
+            f"WHEN {sqlite_overlap(blocking)}) "
+            "BEGIN SELECT RAISE(ABORT, 'reservation_no_overlap'); END"
+        )
+        op.execute(
+            "CREATE TRIGGER reservation_no_overlap_update BEFORE UPDATE OF vehicle_id, start_date, end_date, status ON reservation "
+            f"WHEN {sqlite_overlap(blocking)} AND other.id != NEW.id) "
+            "BEGIN SELECT RAISE(ABORT, 'reservation_no_overlap'); END"
+        )
+
+
+def upgrade():
+    op.create_table('scheduler_lease',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('holder', sa.String(length=200), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    replace_overlap_guard(NEW_BLOCKING)
+
+
+def downgrade():
+    replace_overlap_guard(OLD_BLOCKING)
+    op.drop_table('scheduler_lease')
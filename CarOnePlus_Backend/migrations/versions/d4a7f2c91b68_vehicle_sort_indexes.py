@@ -0,0 +1,34 @@
+"""vehicle sort indexes
+
+Revision ID: d4a7f2c91b68
+Revises: 6a1d4c8e2b35
+Create Date: 2026-10-18 15:02:44.907215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7f2c91b68'
+down_revision = '6a1d4c8e2b35'
+branch_labels = None
+depends_on = None
+
+
+# Doit rester identique à app.models.VEHICLE_RATING_SQL
+VEHICLE_RATING_SQL = "coalesce(rating_sum / nullif(rating_count, 0), 0)"
+
+
+def upgrade():
+    op.create_index('ix_vehicle_available_id', 'vehicle', ['available', 'id'], unique=False)
+    op.create_index('ix_vehicle_available_price', 'vehicle', ['available', 'price_per_day', 'id'], unique=False)
+    op.create_index('ix_vehicle_available_rating', 'vehicle', ['available', sa.text(VEHICLE_RATING_SQL), 'id'], unique=False)
+    op.create_index('ix_vehicle_available_lat_lng', 'vehicle', ['available', 'lat', 'lng'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_vehicle_available_lat_lng', table_name='vehicle')
+    op.drop_index('ix_vehicle_available_rating', table_name='vehicle')
+    op.drop_index('ix_vehicle_available_price', table_name='vehicle')
+    op.drop_index('ix_vehicle_available_id', table_name='vehicle')
@@ -0,0 +1,26 @@
+"""reservation availability index
+
+Revision ID: e91b3f6a2d04
+Revises: d4a7f2c91b68
+Create Date: 2026-10-18 16:10:29.446103
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91b3f6a2d04'
+down_revision = 'd4a7f2c91b68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.create_index('ix_reservation_vehicle_dates_status', ['vehicle_id', 'start_date', 'end_date', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservation_vehicle_dates_status')
@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+import pytest
+
+# La configuration lit DATABASE_URL à l'import : base SQLite sur fichier (plusieurs connexions,
+# comme plusieurs workers) et stockage dans un dossier temporaire, avant d'importer l'application
+_tmp = tempfile.mkdtemp(prefix="caroneplus-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "test.db")
+os.environ.setdefault("STORAGE_ROOT", os.path.join(_tmp, "storage"))
+os.environ.setdefault("IMAGE_CACHE_FOLDER", os.path.join(_tmp, "images"))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Vehicle  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.app_context():
+        @event.listens_for(db.engine, "connect")
+        def set_busy_timeout(connection, record):
+            connection.execute("PRAGMA busy_timeout = 10000")
+
+        db.engine.dispose()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def owner(app):
+    user = User(email="owner@example.com", password="x", is_active=True)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_vehicles(owner, count, **values):
+    vehicles = [
+        Vehicle(
+            owner_id=owner.id,
+            title=f"Vehicle {i}",
+            description="Description",
+            price_per_day=50,
+            localisation="Paris",
+            **values,
+        )
+        for i in range(count)
+    ]
+    db.session.add_all(vehicles)
+    db.session.commit()
+    return vehicles
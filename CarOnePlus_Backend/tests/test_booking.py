@@ -0,0 +1,59 @@
+import threading
+from datetime import date
+
+import pytest
+
+from app import booking
+from app.booking import ReservationConflict, book_vehicle
+from app.models import Reservation, User, db
+
+from conftest import make_vehicles
+
+PARALLEL_BOOKINGS = 20
+
+
+def book_concurrently(app, vehicle_id, user_ids, start_date, end_date):
+    """Lance une réservation par utilisateur, toutes en même temps ; retourne "ok" / "conflict" par demande."""
+    barrier = threading.Barrier(len(user_ids))
+    results = []
+    lock = threading.Lock()
+
+    def attempt(user_id):
+        with app.app_context():
+            barrier.wait()
+            try:
+                book_vehicle(user_id, vehicle_id, start_date, end_date)
+                outcome = "ok"
+            except ReservationConflict:
+                outcome = "conflict"
+            finally:
+                db.session.remove()
+            with lock:
+                results.append(outcome)
+
+    threads = [threading.Thread(target=attempt, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.mark.parametrize("precheck", [True, False], ids=["with-precheck", "database-only"])
+def test_parallel_bookings_single_winner(app, owner, monkeypatch, precheck):
+    if not precheck:
+        # Sans la vérification applicative, seule la contrainte (trigger SQLite / EXCLUDE Postgres) protège
+        monkeypatch.setattr(booking, "find_conflict", lambda *args: None)
+
+    vehicle_id = make_vehicles(owner, 1)[0].id
+    renters = [User(email=f"renter{i}@example.com", password="x", is_active=True) for i in range(PARALLEL_BOOKINGS)]
+    db.session.add_all(renters)
+    db.session.commit()
+    user_ids = [renter.id for renter in renters]
+    db.session.remove()
+
+    results = book_concurrently(app, vehicle_id, user_ids, date(2030, 3, 1), date(2030, 3, 5))
+
+    assert results.count("ok") == 1
+    assert results.count("conflict") == PARALLEL_BOOKINGS - 1
+    assert Reservation.query.filter_by(vehicle_id=vehicle_id).count() == 1
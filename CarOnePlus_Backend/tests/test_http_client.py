@@ -0,0 +1,38 @@
+from flask_jwt_extended import create_access_token
+
+from app import db, http_client
+from app.models import User
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_retried_responses_are_closed(app, monkeypatch):
+    responses = [FakeResponse(503), FakeResponse(429), FakeResponse(200)]
+    monkeypatch.setattr(http_client.session, "request", lambda method, url, **kwargs: responses.pop(0))
+    monkeypatch.setattr(http_client, "backoff", 0)
+    first, second, last = responses
+
+    assert http_client.get("https://example.com/", retries=2) is last
+    assert first.closed and second.closed
+    assert not last.closed
+
+
+def metrics_status(app, role):
+    user = User(email=f"{role}@example.com", password="x", is_active=True, role=role)
+    db.session.add(user)
+    db.session.commit()
+    token = create_access_token(identity=str(user.id))
+    return app.test_client().get("/metrics/http", headers={"Authorization": f"Bearer {token}"}).status_code
+
+
+def test_http_metrics_are_reserved_to_admins(app):
+    assert metrics_status(app, "proprietaire") == 403
+    assert metrics_status(app, "admin") == 200
+    assert app.test_client().get("/metrics/http").status_code == 401
@@ -0,0 +1,37 @@
+import hashlib
+import io
+import os
+
+from PIL import Image
+
+from app import storage
+
+
+def store(content, extension="jpg"):
+    """Écrit `content` dans le stockage par contenu et retourne sa clé."""
+    key = f"{hashlib.sha256(content).hexdigest()}.{extension}"
+    path = storage.path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as out:
+        out.write(content)
+    return key
+
+
+def test_resized_variant_of_an_image(app):
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 300), "red").save(buffer, format="JPEG")
+    key = store(buffer.getvalue())
+
+    response = app.test_client().get(f"/vehicles/images/{key}?w=128")
+
+    assert response.status_code == 200
+    assert Image.open(io.BytesIO(response.data)).size == (128, 96)
+
+
+def test_resizing_a_file_that_is_not_an_image(app):
+    key = store(b"%PDF-1.4 not an image")
+    client = app.test_client()
+
+    assert client.get(f"/vehicles/images/{key}?w=128").status_code == 415
+    # Le fichier reste servi tel quel sans déclinaison
+    assert client.get(f"/vehicles/images/{key}").status_code == 200
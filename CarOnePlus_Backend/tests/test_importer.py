@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+
+from app import geocoder
+from app.importer import import_vehicles
+from app.models import Vehicle
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    calls = []
+    monkeypatch.setattr(geocoder, "enqueue", calls.append)
+    return calls
+
+
+def ndjson(*rows):
+    return io.BytesIO("".join(json.dumps(row) + "\n" for row in rows).encode("utf-8"))
+
+
+def vehicle_row(title, **values):
+    return {"title": title, "description": "Description", "price_per_day": 50, "localisation": "Paris", **values}
+
+
+def test_imported_vehicles_without_coordinates_are_geocoded(app, owner, enqueued):
+    stream = ndjson(vehicle_row("A"), vehicle_row("B", lat=48.85, lng=2.35), vehicle_row("C"))
+
+    report = import_vehicles(stream, "ndjson", owner.id, batch_size=2)
+
+    assert report["inserted"] == 3
+    located = {vehicle.title: vehicle.id for vehicle in Vehicle.query}
+    assert enqueued == [[located["A"]], [located["C"]]]
+
+
+def test_dry_run_enqueues_nothing(app, owner, enqueued):
+    import_vehicles(ndjson(vehicle_row("A")), "ndjson", owner.id, dry_run=True)
+
+    assert enqueued == []
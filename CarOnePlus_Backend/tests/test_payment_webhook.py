@@ -0,0 +1,62 @@
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+import stripe
+
+from app.lifecycle import run_lifecycle
+from app.models import Payment, Reservation, db
+
+from conftest import make_vehicles
+
+
+@pytest.fixture
+def refunds(monkeypatch):
+    calls = []
+    monkeypatch.setattr(stripe.Refund, "create", lambda **params: calls.append(params))
+    return calls
+
+
+def checkout_completed(client, reservation):
+    session = {
+        "metadata": {"reservation_id": reservation.id, "user_id": reservation.user_id},
+        "amount_total": 2000,
+        "payment_intent": "pi_test",
+    }
+    payload = {"type": "checkout.session.completed", "data": {"object": session}}
+    return client.post("/payments/webhook", data=json.dumps(payload))
+
+
+def pending_reservation(owner):
+    vehicle = make_vehicles(owner, 1)[0]
+    start = date.today() + timedelta(days=5)
+    reservation = Reservation(user_id=owner.id, vehicle_id=vehicle.id, start_date=start, end_date=start)
+    db.session.add(reservation)
+    db.session.commit()
+    return reservation
+
+
+def test_webhook_confirms_pending_reservation_once(app, owner, refunds):
+    reservation = pending_reservation(owner)
+    client = app.test_client()
+
+    assert checkout_completed(client, reservation).status_code == 200
+    # Stripe peut renvoyer le même événement
+    assert checkout_completed(client, reservation).status_code == 200
+
+    assert db.session.get(Reservation, reservation.id).status == "CONFIRMER"
+    assert [p.status for p in Payment.query.all()] == ["succeeded"]
+    assert refunds == []
+
+
+def test_webhook_refunds_expired_reservation(app, owner, refunds):
+    reservation = pending_reservation(owner)
+    run_lifecycle(now=datetime.utcnow() + timedelta(seconds=app.config["RESERVATION_PENDING_TTL"] + 60))
+    client = app.test_client()
+
+    assert checkout_completed(client, reservation).status_code == 200
+    assert checkout_completed(client, reservation).status_code == 200
+
+    assert db.session.get(Reservation, reservation.id).status == "EXPIRER"
+    assert [p.status for p in Payment.query.all()] == ["refunded"]
+    assert refunds == [{"payment_intent": "pi_test"}]
@@ -0,0 +1,37 @@
+from sqlalchemy import event
+
+from app.models import Vehicle, VehicleImage, db
+from app.routes.vehicles import serialize_vehicles
+
+from conftest import make_vehicles
+
+PAGE_SIZE = 50
+
+
+def test_serialize_vehicles_fixed_query_count(app, owner):
+    vehicles = make_vehicles(owner, PAGE_SIZE)
+    db.session.add_all(
+        VehicleImage(vehicle_id=vehicle.id, file_name=f"{vehicle.id}-{i}.jpg", file_path="unused")
+        for vehicle in vehicles for i in range(3)
+    )
+    db.session.commit()
+    db.session.remove()
+
+    selects = []
+
+    def count_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count_selects)
+    try:
+        with app.test_request_context():
+            page = Vehicle.query.order_by(Vehicle.id).limit(PAGE_SIZE).all()
+            serialized = serialize_vehicles(page)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_selects)
+
+    # Une requête pour la page, une pour toutes les images : pas de N+1
+    assert len(selects) == 2
+    assert len(serialized) == PAGE_SIZE
+    assert all(len(vehicle["images"]) == 3 for vehicle in serialized)
@@ -0,0 +1,26 @@
+import io
+import os
+
+from app import db, storage
+from app.models import StoredFile
+
+
+def test_file_is_stored_only_when_the_transaction_commits(app):
+    staged = storage.stage(io.BytesIO(b"committed"), "jpg")
+    path = storage.save_staged(staged)
+
+    assert not os.path.exists(path)
+    db.session.commit()
+
+    assert os.path.exists(path)
+    assert db.session.get(StoredFile, staged.key).ref_count == 1
+
+
+def test_rolled_back_upload_leaves_no_file(app):
+    staged = storage.stage(io.BytesIO(b"rolled back"), "jpg")
+    path = storage.save_staged(staged)
+    db.session.rollback()
+
+    assert not os.path.exists(path)
+    assert not os.path.exists(staged.tmp_path)
+    assert db.session.get(StoredFile, staged.key) is None
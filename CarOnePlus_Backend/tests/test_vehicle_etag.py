@@ -0,0 +1,16 @@
+from conftest import make_vehicles
+
+
+def test_missing_vehicle_is_not_found_even_with_if_none_match_star(app):
+    response = app.test_client().get("/vehicles/999", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 404
+
+
+def test_unchanged_vehicle_is_not_modified(app, owner):
+    (vehicle,) = make_vehicles(owner, 1)
+    client = app.test_client()
+
+    etag = client.get(f"/vehicles/{vehicle.id}").headers["ETag"]
+
+    assert client.get(f"/vehicles/{vehicle.id}", headers={"If-None-Match": etag}).status_code == 304